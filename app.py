@@ -1,18 +1,87 @@
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify
+from flask import Flask, Request, Response, render_template, request, send_file, flash, redirect, url_for, jsonify
+import json
 import os
+import re
+import sys
+import tempfile
+import time
+from uuid import uuid4
 from werkzeug.utils import secure_filename
-from pptx_extractor import PPTXExtractor
+from pptx_extractor import PPTXExtractor, slides_from_json, slides_to_json
+from extraction_cache import ExtractionCache, sha256_file
+from slide_media import MediaCache, process_media, sniff_content_type, default_max_side
+from slide_store import create_slide_store, default_max_uploads
+from backend.utils.jobs import JobManager
+from backend.utils.job_store import JobStore
+from backend.utils.pulse import Pulse
+from backend.utils.llm import use_fake_llm, use_pulse_client
+from backend.utils.llm_cache import LLMCache
+from backend.utils.metrics import metrics
+from backend.utils.ratelimit import RateLimiter, default_requests_per_minute, default_tokens_per_minute
+
+
+class SpooledRequest(Request):
+    """Keep uploaded files in memory, only spilling to disk past UPLOAD_SPOOL_MAX_SIZE."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_SIZE'])
+
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
 app.secret_key = 'your-secret-key-here'  # Required for flash messages
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pptx'}
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_SPOOL_MAX_SIZE'] = app.config['MAX_CONTENT_LENGTH']
+# Extracted slides are kept per upload ID; use the disk backend when running several workers
+app.config['SLIDE_STORE'] = os.environ.get('SLIDE_STORE', 'memory')
+app.config['SLIDE_STORE_FOLDER'] = os.environ.get('SLIDE_STORE_FOLDER', 'slide_store')
+app.config['SLIDE_STORE_MAX_UPLOADS'] = int(os.environ.get('SLIDE_STORE_MAX_UPLOADS', default_max_uploads))
+app.config['EXTRACTION_CACHE_FOLDER'] = os.environ.get('EXTRACTION_CACHE_FOLDER', 'extraction_cache')
+app.config['EXTRACTION_CACHE_MAX_BYTES'] = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+app.config['MEDIA_CACHE_FOLDER'] = os.environ.get('MEDIA_CACHE_FOLDER', 'media_cache')
+app.config['MEDIA_CACHE_MAX_BYTES'] = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+app.config['MEDIA_MAX_SIDE'] = int(os.environ.get('MEDIA_MAX_SIDE', default_max_side))
+
+# Extracted decks keyed by the SHA-256 of the uploaded bytes, so re-uploads skip extraction
+extraction_cache = ExtractionCache(app.config['EXTRACTION_CACHE_FOLDER'],
+                                   app.config['EXTRACTION_CACHE_MAX_BYTES'])
+# Downsampled slide images keyed by content hash, shared across decks. Downsampling needs Pillow
+# (pip install Pillow); without it only originals already within MEDIA_MAX_SIDE are cached
+media_cache = MediaCache(app.config['MEDIA_CACHE_FOLDER'], app.config['MEDIA_CACHE_MAX_BYTES'],
+                         app.config['MEDIA_MAX_SIDE'])
+slide_store = create_slide_store(app.config['SLIDE_STORE'], app.config['SLIDE_STORE_FOLDER'],
+                                 app.config['SLIDE_STORE_MAX_UPLOADS'])
+
+# Finished pulses are saved here so a revised deck can reuse their populations and reviews
+app.config['PULSE_FOLDER'] = os.environ.get('PULSE_FOLDER', 'pulses')
+
+# Persona analysis runs in the background; PULSE_JOB_WORKERS bounds how many pulses run at once
+app.config['PULSE_JOB_WORKERS'] = int(os.environ.get('PULSE_JOB_WORKERS', 2))
+# Job status and events live in SQLite so any worker process can serve /jobs/<id>; set JOB_STORE_PATH= for
+# a single process. Event streams hold a connection, so run gunicorn with threaded workers (gunicorn.conf.py)
+app.config['JOB_STORE_PATH'] = os.environ.get('JOB_STORE_PATH', 'jobs.sqlite')
+# Event streams close after this long and the browser reconnects from the last event it saw
+app.config['JOB_EVENTS_MAX_SECONDS'] = int(os.environ.get('JOB_EVENTS_MAX_SECONDS', 300))
+job_manager = JobManager(max_workers=app.config['PULSE_JOB_WORKERS'],
+                         store=JobStore(app.config['JOB_STORE_PATH']) if app.config['JOB_STORE_PATH'] else None)
+
+# All LLM calls share one request/token budget; PULSE_FAKE_LLM swaps in a local
+# deterministic stand-in, for testing without API calls
+rate_limiter = RateLimiter(requests_per_minute=int(os.environ.get('LLM_REQUESTS_PER_MINUTE', default_requests_per_minute)),
+                           tokens_per_minute=int(os.environ.get('LLM_TOKENS_PER_MINUTE', default_tokens_per_minute)))
+# LLM responses are cached in SQLite across pulses and worker processes; set LLM_CACHE_PATH= to disable
+app.config['LLM_CACHE_PATH'] = os.environ.get('LLM_CACHE_PATH', 'llm_cache.sqlite')
+app.config['LLM_CACHE_MAX_BYTES'] = int(os.environ.get('LLM_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+app.config['LLM_CACHE_TTL'] = int(os.environ.get('LLM_CACHE_TTL', 30 * 24 * 60 * 60))
+llm_cache = LLMCache(app.config['LLM_CACHE_PATH'], app.config['LLM_CACHE_MAX_BYTES'],
+                     app.config['LLM_CACHE_TTL']) if app.config['LLM_CACHE_PATH'] else None
+if os.environ.get('PULSE_FAKE_LLM'):
+    use_fake_llm(float(os.environ.get('PULSE_FAKE_LLM_LATENCY', 0)), rate_limiter, llm_cache)
+else:
+    use_pulse_client(rate_limiter, llm_cache)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -20,107 +89,130 @@ def allowed_file(filename):
 @app.route('/', methods=['GET', 'POST'])
 def upload_file():
     if request.method == 'POST':
-        # Check if a file was uploaded
-        if 'file' not in request.files:
-            flash('No file selected')
-            return redirect(request.url)
-        
-        file = request.files['file']
-        if file.filename == '':
-            flash('No file selected')
-            return redirect(request.url)
-        
-        if file and allowed_file(file.filename):
-            # Secure the filename and save the file
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            try:
-                # Check file signature
-                with open(filepath, 'rb') as f:
-                    magic = f.read(4)
-                    if magic != b'PK\x03\x04':
-                        if magic == b'\xd0\xcf\x11\xe0':
-                            flash('Error: This appears to be an old format PowerPoint file (.ppt). Please save it as .pptx format and try again.')
-                        else:
-                            flash('Error: Not a valid PowerPoint file')
-                        os.remove(filepath)
-                        return redirect(request.url)
-                
-                # Extract content
-                extractor = PPTXExtractor(filepath)
-                extractor.extract_content()
-                
-                # Generate summary
-                summary = f"""PowerPoint Extraction Summary
+        with metrics.span('upload'):
+            return handle_upload()
+    
+    return render_template('upload.html', summary=None, title=None, description=None, text_content=None, notes_content=None)
+
+def handle_upload():
+    """Validate, extract and store one uploaded deck."""
+    # Check if a file was uploaded
+    if 'file' not in request.files:
+        flash('No file selected')
+        return redirect(request.url)
+    
+    file = request.files['file']
+    if file.filename == '':
+        flash('No file selected')
+        return redirect(request.url)
+    
+    if file and allowed_file(file.filename):
+        # The upload is already spooled in memory; work on the stream directly
+        filename = secure_filename(file.filename)
+        stream = file.stream
+
+        try:
+            # Check file signature
+            stream.seek(0)
+            magic = stream.read(4)
+            if magic != b'PK\x03\x04':
+                if magic == b'\xd0\xcf\x11\xe0':
+                    flash('Error: This appears to be an old format PowerPoint file (.ppt). Please save it as .pptx format and try again.')
+                else:
+                    flash('Error: Not a valid PowerPoint file')
+                return redirect(request.url)
+
+            digest = sha256_file(stream)
+            cached = extraction_cache.get(digest)
+            metrics.inc('pulse_extraction_cache_total', result='miss' if cached is None else 'hit')
+
+            if cached is None:
+                # Extract content slide by slide
+                extractor = PPTXExtractor(stream)
+                slides = extractor.iter_slides()
+            else:
+                slides = slides_from_json(cached['slides'])
+
+            slide_records = []
+            text_blocks = []
+            notes_blocks = []
+            title = ""
+            description = ""
+            with metrics.span('extract'):
+                for slide in slides:
+                    slide_records.append(slide)
+                    if slide.text:
+                        if not text_blocks:
+                            # Title from the first slide with text, description from the rest of it
+                            if slide.title:
+                                title = slide.title.replace('\n', ' ')
+                                description = slide.body
+                            else:
+                                lines = slide.body.split('\n')
+                                title = lines[0].strip()
+                                description = '\n'.join(lines[1:]).strip()
+                        text_blocks.append(f"Slide {slide.index}:\n{slide.text}")
+                    if slide.notes:
+                        notes_blocks.append(f"Slide {slide.index} Notes:\n{slide.notes}")
+
+            if cached is None:
+                media_files = extractor.list_media()
+                with metrics.span('media'):
+                    images = process_media(stream, slide_records, media_cache)
+                extraction_cache.put(digest, {'slides': [slide.to_dict() for slide in slide_records],
+                                              'media': media_files,
+                                              'images': images})
+            else:
+                media_files = cached['media']
+                images = cached['images']
+                # images is the media manifest, {'media': {...}, 'images': {digest: {...}}}
+                if any(image['variant'] and not media_cache.has(image_digest)
+                       for image_digest, image in images['images'].items()):
+                    # Variants were evicted since the deck was extracted; recreate them from the upload
+                    with metrics.span('media'):
+                        images = process_media(stream, slide_records, media_cache)
+                    extraction_cache.put(digest, {**cached, 'images': images})
+
+            # Generate summary
+            summary = f"""PowerPoint Extraction Summary
 {'='*30}
 
-Source File: {filepath}
-Text Extractions: {len(extractor.text_content)} slides with text
-Notes Extractions: {len(extractor.notes_content)} slides with notes
-Media Files: {len(extractor.media_files)} files extracted
+Source File: {filename}
+Text Extractions: {len(text_blocks)} slides with text
+Notes Extractions: {len(notes_blocks)} slides with notes
+Media Files: {len(media_files)} files extracted
 """
-                
-                # Extract title and description from first slide content
-                if extractor.text_content:
-                    first_slide_text = extractor.text_content[0].split('\n', 1)[1] if '\n' in extractor.text_content[0] else extractor.text_content[0]
-                    
-                    # Extract title (first line) and description (rest of content)
-                    lines = first_slide_text.split('\n')
-                    title = lines[0].strip()
-                    description = '\n'.join(lines[1:]).strip() if len(lines) > 1 else ""
-                else:
-                    title = ""
-                    description = ""
-                
-                # Get remaining text content and notes
-                text_content = "\n\n".join(extractor.text_content[1:]) if len(extractor.text_content) > 1 else ""
-                notes_content = "\n\n".join(extractor.notes_content) if extractor.notes_content else ""
-
-                # Create JSON structure for slides
-                slides_data = {}
-                for i, text in enumerate(extractor.text_content):
-                    slide_num = i + 1
-                    slide_text = text.split('\n', 1)[1] if '\n' in text else text  # Remove "Slide X:" prefix
-                    
-                    # Find corresponding notes for this slide
-                    slide_notes = ""
-                    for note in extractor.notes_content:
-                        if note.startswith(f"Slide {slide_num} Notes:"):
-                            slide_notes = note.split('\n', 1)[1] if '\n' in note else ""
-                            break
-                    
-                    slides_data[f"slide{slide_num}"] = {
-                        "text": slide_text,
-                        "notes": slide_notes
-                    }
-                
-                # Save to JSON file
-                import json
-                with open('slides_content.json', 'w', encoding='utf-8') as f:
-                    json.dump(slides_data, f, indent=2, ensure_ascii=False)
-                
-                # Clean up uploaded file
-                os.remove(filepath)
-                
-                return render_template('upload.html', 
-                                     summary=summary,
-                                     title=title,
-                                     description=description,
-                                     text_content=text_content,
-                                     notes_content=notes_content)
-            
-            except Exception as e:
-                flash(f'Error processing file: {str(e)}')
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                return render_template('upload.html')
-        else:
-            flash('Only .pptx files are allowed')
+
+            # Get remaining text content and notes
+            text_content = "\n\n".join(text_blocks[1:]) if len(text_blocks) > 1 else ""
+            notes_content = "\n\n".join(notes_blocks) if notes_blocks else ""
+
+            # Keep the slides for this upload only
+            upload_id = uuid4().hex
+            slide_store.save(upload_id, {
+                'filename': filename,
+                'sha256': digest,
+                'slides': slides_to_json(slide_records),
+                'media': media_files,
+                'images': images
+            })
+
+            return render_template('upload.html', 
+                                 upload_id=upload_id,
+                                 summary=summary,
+                                 title=title,
+                                 description=description,
+                                 text_content=text_content,
+                                 notes_content=notes_content)
+        
+        except Exception as e:
+            flash(f'Error processing file: {str(e)}')
             return render_template('upload.html')
-    
-    return render_template('upload.html', summary=None, title=None, description=None, text_content=None, notes_content=None)
+        finally:
+            stream.close()
+    else:
+        flash('Only .pptx files are allowed')
+        return render_template('upload.html')
 
 @app.route('/update_presentation_info', methods=['POST'])
 def update_presentation_info():
@@ -148,5 +240,151 @@ def update_presentation_info():
         'reviewers': reviewers
     })
 
+def saved_pulse_folder(pulse_id):
+    """Folder of a saved pulse, or None if pulse_id is invalid or unknown."""
+    if not pulse_id or not re.fullmatch(r'[A-Za-z0-9_-]+', pulse_id):
+        return None
+    folder = os.path.join(app.config['PULSE_FOLDER'], pulse_id)
+    return folder if os.path.isfile(os.path.join(folder, 'pulse_spec.json')) else None
+
+def run_pulse_job(job, data, ppt_json):
+    base_folder = saved_pulse_folder(data.get('base_pulse_id'))
+    if base_folder:
+        # A revised deck: keep the saved personas and populations, and the reviews of unchanged slides
+        pulse = Pulse(pulse_folder=base_folder, load_from_folder=True)
+        diff = pulse.revise(Pulse.ppt_from_run_request(data, ppt_json))
+        job.publish('revision', diff)
+    else:
+        pulse = Pulse.from_run_request(data, ppt_json)
+    job.publish('pulse', {'pulse_id': pulse.pulse_id})
+    with metrics.trace() as trace:
+        try:
+            pulse.run(on_result=job.add_result, should_stop=job.is_cancelled,
+                      on_progress=lambda progress: job.publish('progress', progress))
+        finally:
+            job.set_timings(trace.summary())
+    pulse.save_pulse(os.path.join(app.config['PULSE_FOLDER'], pulse.pulse_id))
+
+def run_decks_job(job, data, decks):
+    """Review several uploaded decks with one set of personas; decks is a list of (request, slides)."""
+    # One population reviews every deck, so it must not be shaped by the first one
+    pulse = Pulse.from_run_request(data, decks[0][1], describe_deck=False)
+    job.publish('pulse', {'pulse_id': pulse.pulse_id})
+    ppts = [Pulse.ppt_from_run_request({**data, **deck_data}, slides) for deck_data, slides in decks]
+    with metrics.trace() as trace:
+        try:
+            comparison = pulse.run_decks(ppts, on_result=job.add_result, should_stop=job.is_cancelled,
+                                         on_progress=lambda progress: job.publish('progress', progress))
+        finally:
+            job.set_timings(trace.summary())
+    job.publish('comparison', comparison)
+
+@app.route('/run_analysis', methods=['POST'])
+def run_analysis():
+    data = request.get_json(silent=True) or {}
+    # 'decks' (a list of {upload_id, ppt_title, ...}) compares several decks with the same personas
+    decks = data.get('decks')
+    if decks is not None and not (isinstance(decks, list) and all(
+            isinstance(deck, dict) and deck.get('upload_id') and isinstance(deck['upload_id'], str) for deck in decks)):
+        return jsonify({'status': 'error', 'message': 'decks must be a list of objects with an upload_id'}), 400
+    deck_requests = decks or [{'upload_id': data.get('upload_id')}]
+    records = [slide_store.get(deck.get('upload_id') or '') for deck in deck_requests]
+    if any(record is None for record in records):
+        return jsonify({'status': 'error', 'message': 'Upload not found, please upload the presentation again'}), 404
+    if data.get('base_pulse_id') and not data.get('decks'):
+        if saved_pulse_folder(data['base_pulse_id']) is None:
+            return jsonify({'status': 'error', 'message': 'Pulse to revise not found'}), 404
+    elif not data.get('personas'):
+        return jsonify({'status': 'error', 'message': 'No personas provided'}), 400
+    personas = data.get('personas') or []
+    if not isinstance(personas, list) or not all(
+            isinstance(persona, dict) and all(persona.get(field) and isinstance(persona[field], str)
+                                              for field in ('name', 'description')) for persona in personas):
+        return jsonify({'status': 'error', 'message': 'Every persona needs a name and a description'}), 400
+
+    if data.get('decks'):
+        job = job_manager.submit(run_decks_job, data,
+                                 [(deck, record['slides']) for deck, record in zip(deck_requests, records)])
+    else:
+        job = job_manager.submit(run_pulse_job, data, records[0]['slides'])
+    return jsonify({
+        'status': job.status,
+        'job_id': job.job_id,
+        'status_url': url_for('job_status', job_id=job.job_id),
+        'events_url': url_for('job_events', job_id=job.job_id),
+        'cancel_url': url_for('cancel_job', job_id=job.job_id),
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    if not request.environ.get('wsgi.multithread') and 'gevent' not in sys.modules:
+        # A sync worker would be pinned for the whole run; clients fall back to polling status_url
+        return jsonify({'status': 'error', 'message': 'Event streams need a threaded server, poll status_url'}), 503
+    try:
+        start = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        start = 0
+    start = max(start, 0)
+    deadline = time.time() + app.config['JOB_EVENTS_MAX_SECONDS']
+
+    def stream():
+        for index, event in job.iter_events(start):
+            if event is None:
+                if time.time() > deadline:
+                    return  # let the client reconnect instead of holding the connection for the whole run
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {index}\nevent: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+            if time.time() > deadline:
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/slides/<upload_id>', methods=['GET'])
+def get_slides(upload_id):
+    record = slide_store.get(upload_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+    return jsonify(record)
+
+@app.route('/media/<digest>', methods=['GET'])
+def get_media(digest):
+    data = media_cache.get(digest) if re.fullmatch(r'[0-9a-f]{64}', digest) else None
+    if data is None:
+        return jsonify({'status': 'error', 'message': 'Image not found'}), 404
+    return Response(data, mimetype=sniff_content_type(data),
+                    headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'extraction_cache': extraction_cache.stats(),
+        'media_cache': media_cache.stats(),
+        'llm_cache': llm_cache.stats() if llm_cache else None,
+        'rate_limiter': rate_limiter.stats(),
+    })
+
 if __name__ == '__main__':
     app.run(debug=True)
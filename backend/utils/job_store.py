@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import threading
+
+class JobStore:
+    """SQLite-backed job status, events and cancel requests shared by worker processes.
+
+    A job runs in the process that accepted it, but any process can report its
+    status, stream its events or ask it to stop, so requests may land on any
+    gunicorn worker. WAL mode lets readers poll while the running job writes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                timings TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT,
+                PRIMARY KEY (job_id, idx)
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, job):
+        self._connection().execute("""
+            INSERT INTO jobs (job_id, status, created_at, started_at, finished_at, error, timings)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job_id) DO UPDATE SET status = excluded.status, started_at = excluded.started_at,
+                finished_at = excluded.finished_at, error = excluded.error, timings = excluded.timings""",
+            (job.job_id, job.status, job.created_at, job.started_at, job.finished_at, job.error,
+             json.dumps(job.timings) if job.timings is not None else None))
+
+    def add_event(self, job_id, index, event_type, data):
+        self._connection().execute("INSERT OR REPLACE INTO events (job_id, idx, type, data) VALUES (?, ?, ?, ?)",
+                                   (job_id, index, event_type, json.dumps(data, ensure_ascii=False)))
+
+    def load(self, job_id):
+        row = self._connection().execute("""
+            SELECT job_id, status, created_at, started_at, finished_at, error, timings
+            FROM jobs WHERE job_id = ?""", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'status': row[1],
+            'created_at': row[2],
+            'started_at': row[3],
+            'finished_at': row[4],
+            'error': row[5],
+            'timings': json.loads(row[6]) if row[6] else None,
+        }
+
+    def events(self, job_id, start=0, event_type=None):
+        """(index, event) pairs of a job from start on, optionally of one type only."""
+        query = "SELECT idx, type, data FROM events WHERE job_id = ? AND idx >= ?"
+        params = [job_id, start]
+        if event_type:
+            query += " AND type = ?"
+            params.append(event_type)
+        rows = self._connection().execute(query + " ORDER BY idx", params).fetchall()
+        return [(idx, {'type': kind, 'data': json.loads(data) if data else None}) for idx, kind, data in rows]
+
+    def request_cancel(self, job_id):
+        cursor = self._connection().execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id):
+        row = self._connection().execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def prune(self, max_jobs, finished_states):
+        """Forget the oldest finished jobs beyond max_jobs."""
+        conn = self._connection()
+        placeholders = ','.join('?' * len(finished_states))
+        rows = conn.execute(f"""
+            SELECT job_id FROM jobs WHERE status IN ({placeholders})
+            ORDER BY created_at DESC LIMIT -1 OFFSET ?""", (*finished_states, max_jobs)).fetchall()
+        for (job_id,) in rows:
+            conn.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return len(rows)
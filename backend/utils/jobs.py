@@ -0,0 +1,242 @@
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+default_max_workers = 2
+default_max_jobs = 200
+default_event_timeout = 15
+# How often jobs read cross-process cancel requests, and StoredJob polls for events
+default_poll_interval = 0.5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+class Job:
+    """A job running in this process; mirrored to store, if given, for other processes."""
+
+    def __init__(self, job_id=None, store=None):
+        self.job_id = job_id or uuid4().hex
+        self.store = store
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.results = []
+        self.error = None
+        self.events = []
+        self.timings = None
+        self.future = None
+
+        self._cancel_event = threading.Event()
+        # Reentrant, so set_status can publish while holding it
+        self._condition = threading.Condition(threading.RLock())
+        self._cancel_checked_at = 0.0
+        if store is not None:
+            store.save(self)
+
+    def publish(self, event_type, data=None):
+        with self._condition:
+            index = len(self.events)
+            self.events.append({'type': event_type, 'data': data})
+            if self.store is not None:
+                self.store.add_event(self.job_id, index, event_type, data)
+            self._condition.notify_all()
+
+    def add_result(self, result):
+        self.results.append(result)
+        self.publish('result', result)
+
+    def set_status(self, status, error=None):
+        # A reader that sees a finished job must also see its final status event:
+        # change both under the lock, and store the event before the status
+        with self._condition:
+            if status == RUNNING:
+                self.started_at = time.time()
+            elif status in FINISHED_STATES:
+                self.finished_at = time.time()
+            self.status = status
+            self.error = error
+            self.publish('status', {'status': status, 'error': error})
+            if self.store is not None:
+                self.store.save(self)
+
+    def set_timings(self, timings):
+        self.timings = timings
+        if self.store is not None:
+            self.store.save(self)
+        self.publish('timings', timings)
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.store is not None:
+            self.store.request_cancel(self.job_id)
+
+    def is_cancelled(self):
+        if self._cancel_event.is_set():
+            return True
+        # Cancel requests may come through another process; read them at most every poll interval
+        if self.store is not None and time.time() - self._cancel_checked_at >= default_poll_interval:
+            self._cancel_checked_at = time.time()
+            if self.store.cancel_requested(self.job_id):
+                self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def is_finished(self):
+        return self.status in FINISHED_STATES
+
+    def iter_events(self, start=0, timeout=default_event_timeout):
+        """Yield (index, event) from start until the job finishes; yields (index, None) on idle timeout."""
+        index = start
+        while True:
+            with self._condition:
+                if index >= len(self.events) and not self.is_finished():
+                    self._condition.wait(timeout)
+                events = self.events[index:]
+                finished = self.is_finished()
+            if not events:
+                if finished:
+                    return
+                yield index, None
+                continue
+            for event in events:
+                yield index, event
+                index += 1
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'results': self.results,
+            'error': self.error,
+            'timings': self.timings,
+        }
+
+class StoredJob:
+    """Read-mostly view of a job running in another process, backed by the job store."""
+
+    def __init__(self, store, record):
+        self.store = store
+        self.job_id = record['job_id']
+        self.record = record
+
+    @property
+    def status(self):
+        return self.record['status']
+
+    def refresh(self):
+        self.record = self.store.load(self.job_id) or self.record
+        return self.record
+
+    def cancel(self):
+        self.store.request_cancel(self.job_id)
+
+    def is_finished(self):
+        return self.status in FINISHED_STATES
+
+    def iter_events(self, start=0, timeout=default_event_timeout):
+        """Same contract as Job.iter_events, polling the store."""
+        index = start
+        idle_since = time.time()
+        while True:
+            events = self.store.events(self.job_id, index)
+            for event_index, event in events:
+                yield event_index, event
+                index = event_index + 1
+            if events:
+                idle_since = time.time()
+                continue
+            if self.is_finished():
+                return
+            self.refresh()
+            if self.is_finished():
+                continue  # pick up the final events
+            if time.time() - idle_since >= timeout:
+                idle_since = time.time()
+                yield index, None
+            time.sleep(default_poll_interval)
+
+    def to_dict(self):
+        self.refresh()
+        return {**self.record,
+                'results': [event['data'] for _, event in self.store.events(self.job_id, event_type='result')]}
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps the most recent ones for polling.
+
+    With a JobStore, job status, events and cancel requests are shared with
+    other processes, so any gunicorn worker can answer for any job.
+    """
+
+    def __init__(self, max_workers=default_max_workers, max_jobs=default_max_jobs, store=None):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pulse-job')
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(job, *args, **kwargs); returns the Job immediately."""
+        job = Job(store=self.store)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, fn, *args, **kwargs)
+        return job
+
+    def _run(self, job, fn, *args, **kwargs):
+        if job.is_cancelled():
+            job.set_status(CANCELLED)
+            return
+        job.set_status(RUNNING)
+        try:
+            fn(job, *args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            job.set_status(FAILED, str(e))
+            return
+        job.set_status(CANCELLED if job.is_cancelled() else COMPLETED)
+
+    def _prune(self):
+        # Forget the oldest finished jobs once over the limit
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].is_finished():
+                del self.jobs[job_id]
+        if self.store is not None:
+            self.store.prune(self.max_jobs, FINISHED_STATES)
+
+    def get(self, job_id):
+        """The job, or a StoredJob view if it runs in another process; None if unknown."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.load(job_id)
+            if record is not None:
+                job = StoredJob(self.store, record)
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        if isinstance(job, Job) and job.future is not None and job.future.cancel():
+            job.set_status(CANCELLED)
+        return job
+
+    def shutdown(self, wait=True):
+        for job in list(self.jobs.values()):
+            job.cancel()
+        self.executor.shutdown(wait=wait)
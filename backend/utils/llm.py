@@ -0,0 +1,199 @@
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+import openai
+from tinytroupe import openai_utils, utils
+from tinytroupe.openai_utils import OpenAIClient
+from backend.utils.ratelimit import RateLimiter
+from backend.utils.llm_cache import LLMCache, cache_key
+from backend.utils.metrics import metrics
+
+default_fake_latency = 0.0
+default_max_rate_limit_retries = 8
+
+class Message(dict):
+    """Chat message as returned by the OpenAI SDK's message.to_dict()."""
+
+    def to_dict(self):
+        return dict(self)
+
+class Choice:
+    def __init__(self, message):
+        self.message = message
+
+class Response:
+    """Minimal stand-in for a chat completion response."""
+
+    def __init__(self, message, usage=None):
+        self.choices = [Choice(Message(message))]
+        self.usage = usage or {}
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['message'], record.get('usage'))
+
+def response_usage(response):
+    usage = getattr(response, 'usage', None) or {}
+    if not isinstance(usage, dict):
+        usage = {'prompt_tokens': usage.prompt_tokens, 'completion_tokens': usage.completion_tokens}
+    return usage
+
+def response_record(response):
+    """JSON-serializable form of a (real or stand-in) chat completion response."""
+    return {'message': response.choices[0].message.to_dict(), 'usage': response_usage(response)}
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def messages_text(messages):
+    return "\n".join(str(m.get('content', '')) for m in messages)
+
+def retry_after(error):
+    """Seconds from a 429 response's Retry-After header, if any."""
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class PulseClient(OpenAIClient):
+    """OpenAI client that paces every call through a shared RateLimiter.
+
+    429 responses are retried here with the limiter's adaptive backoff, which
+    replaces TinyTroupe's fixed WAITING_TIME sleep and exponential backoff.
+    With an LLMCache, identical requests are answered from the cache without
+    touching the API; this replaces TinyTroupe's pickle-based CACHE_API_CALLS.
+    """
+
+    def __init__(self, rate_limiter:RateLimiter=None, max_rate_limit_retries=default_max_rate_limit_retries,
+                 llm_cache:LLMCache=None):
+        super().__init__(cache_api_calls=False)
+        self.rate_limiter = rate_limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.llm_cache = llm_cache
+
+    def send_message(self, current_messages, *args, **kwargs):
+        kwargs['waiting_time'] = 0
+        return super().send_message(current_messages, *args, **kwargs)
+
+    def _raw_model_call(self, model, chat_api_params):
+        if not metrics.enabled:
+            return self._cached_model_call(model, chat_api_params)[0]
+
+        start = time.perf_counter()
+        response, cached = self._cached_model_call(model, chat_api_params)
+        labels = {'model': model, 'persona': metrics.current_labels().get('persona', '')}
+        metrics.inc('pulse_llm_calls_total', cached=str(cached).lower(), **labels)
+        metrics.observe('pulse_llm_seconds', time.perf_counter() - start, **labels)
+        usage = response_usage(response)
+        metrics.inc('pulse_llm_prompt_tokens_total', usage.get('prompt_tokens') or 0, **labels)
+        metrics.inc('pulse_llm_completion_tokens_total', usage.get('completion_tokens') or 0, **labels)
+        return response
+
+    def _cached_model_call(self, model, chat_api_params):
+        """Returns (response, whether it came from the cache)."""
+        if not self.llm_cache or chat_api_params.get('n', 1) != 1:
+            return self._limited_model_call(model, chat_api_params), False
+
+        key = cache_key(model, chat_api_params)
+        record = self.llm_cache.get(key)
+        if record is not None:
+            return Response.from_record(record), True
+        record = response_record(self._limited_model_call(model, chat_api_params))
+        self.llm_cache.put(key, record)
+        return Response.from_record(record), False
+
+    def _limited_model_call(self, model, chat_api_params):
+        tokens = estimate_tokens(messages_text(chat_api_params.get('messages', []))) \
+            + (chat_api_params.get('max_tokens') or 0)
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(tokens)
+            try:
+                response = self._model_call(model, chat_api_params)
+            except openai.RateLimitError as e:
+                attempt += 1
+                if not self.rate_limiter or attempt > self.max_rate_limit_retries:
+                    raise
+                self.rate_limiter.on_rate_limited(retry_after(e))
+                continue
+            if self.rate_limiter:
+                self.rate_limiter.on_success()
+            return response
+
+    def _model_call(self, model, chat_api_params):
+        return super()._raw_model_call(model, chat_api_params)
+
+    def _raw_model_response_extractor(self, response):
+        return response.choices[0].message.to_dict()
+
+class FakeLLMClient(PulseClient):
+    """Deterministic local stand-in for the OpenAI API, for tests and benchmarks.
+
+    Every reply is a JSON object carrying the keys the TinyTroupe factory, agents
+    and result extractors look for, derived from a hash of the request, so the
+    same request always gets the same answer. latency simulates the round trip.
+    """
+
+    def __init__(self, latency=default_fake_latency, rate_limiter:RateLimiter=None, llm_cache:LLMCache=None):
+        super().__init__(rate_limiter, llm_cache=llm_cache)
+        self.latency = latency
+        self.calls = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _setup_from_config(self):
+        pass
+
+    def _model_call(self, model, chat_api_params):
+        with self._lock:
+            self.calls += 1
+            person_number = next(self._counter)
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = messages_text(chat_api_params.get('messages', []))
+        digest = hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+        content = json.dumps({
+            'name': f"Fake Person {digest[:6]} {person_number}",
+            'age': 25 + int(digest[:2], 16) % 40,
+            'nationality': "Fakeland",
+            'occupation': {'title': "Reviewer", 'organization': "Fake Corp", 'description': "Reviews presentations."},
+            'action': {'type': "DONE", 'content': "", 'target': ""},
+            'cognitive_state': {'goals': "Review the presentation", 'attention': "The presentation",
+                                'emotions': "Neutral"},
+            'analysis': {'Content': [f"Feedback {digest[:8]}"]},
+            'qna': [{'Question': f"Question {digest[8:16]}", 'Context': "Fake context", 'Value': "Fake value"}],
+            # Batched extraction requests list their agents as "## Agent: <name>" headers
+            'agents': {name: {'analysis': {'Content': [f"Feedback {digest[:8]}"]},
+                              'qna': [{'Question': f"Question {digest[8:16]}"}]}
+                       for name in re.findall(r'^## Agent: (.+)$', prompt, re.MULTILINE)},
+        })
+        usage = {'prompt_tokens': estimate_tokens(prompt), 'completion_tokens': estimate_tokens(content)}
+        return Response({'role': 'assistant', 'content': content}, usage)
+
+def install_client(client, api_type="pulse"):
+    """Route every TinyTroupe LLM call in this process to client."""
+    openai_utils.register_client(api_type, client)
+    openai_utils.force_api_type(api_type)
+    return client
+
+def use_pulse_client(rate_limiter:RateLimiter=None, llm_cache:LLMCache=None):
+    return install_client(PulseClient(rate_limiter or RateLimiter(), llm_cache=llm_cache))
+
+def use_fake_llm(latency=default_fake_latency, rate_limiter:RateLimiter=None, llm_cache:LLMCache=None):
+    return install_client(FakeLLMClient(latency, rate_limiter, llm_cache), "fake")
+
+def chat(messages, **kwargs):
+    """Send messages through the installed client; returns the reply message dict or None."""
+    return openai_utils.client().send_message(messages, **kwargs)
+
+def chat_json(messages, **kwargs):
+    """Like chat, but parse the reply content as JSON (an empty dict if it is not JSON)."""
+    message = chat(messages, **kwargs)
+    if not message or not message.get('content'):
+        return None
+    return utils.extract_json(message['content'])
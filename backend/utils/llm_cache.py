@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+default_max_bytes = 512 * 1024 * 1024
+default_ttl = 30 * 24 * 60 * 60
+# Rows deleted per statement while evicting
+default_evict_batch = 256
+
+# Request parameters that do not change the completion
+IGNORED_PARAMS = ('messages', 'timeout', 'stream')
+
+def cache_key(model, chat_api_params):
+    """Normalized hash of model, parameters and prompt."""
+    messages = [
+        {'role': m.get('role'), 'content': m.get('content').strip() if isinstance(m.get('content'), str) else m.get('content')}
+        for m in chat_api_params.get('messages', [])
+    ]
+    params = {k: v for k, v in chat_api_params.items() if k not in IGNORED_PARAMS and v is not None}
+    normalized = json.dumps({'model': model, 'params': params, 'messages': messages},
+                            sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """SQLite-backed LLM response cache shared by threads and processes.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the stored responses exceed max_bytes. WAL mode lets many
+    readers and one writer work on the file at the same time.
+
+    Puts keep a running total of the stored bytes, so the table is only
+    summed again (picking up other processes' writes) once it looks full.
+    """
+
+    def __init__(self, db_path, max_bytes=default_max_bytes, ttl=default_ttl):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self.total_bytes = self._stored_bytes(conn)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl and row[2] < now - self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        value = json.loads(row[0])
+        usage = value.get('usage') or {}
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += row[1]
+            self.tokens_saved += (usage.get('prompt_tokens') or 0) + (usage.get('completion_tokens') or 0)
+        return value
+
+    def put(self, key, value):
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return False
+        now = time.time()
+        conn = self._connection()
+        previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        conn.execute("INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                     (key, data, len(data), now, now))
+        with self._lock:
+            self.total_bytes += len(data) - (previous[0] if previous else 0)
+            full = self.total_bytes > self.max_bytes
+        if full:
+            self._evict(conn)
+        return True
+
+    @staticmethod
+    def _stored_bytes(conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self, conn, batch_size=default_evict_batch):
+        if self.ttl:
+            conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        # Recount so writes by other processes are accounted for
+        total = self._stored_bytes(conn)
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT ?", (batch_size,)).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            conn.execute(f"DELETE FROM responses WHERE key IN ({','.join('?' * len(victims))})", victims)
+            evicted += len(victims)
+        with self._lock:
+            self.total_bytes = total
+            self.evictions += evicted
+
+    def stats(self):
+        row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'tokens_saved': self.tokens_saved,
+                'evictions': self.evictions,
+                'entries': row[0],
+                'bytes': row[1],
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,172 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Labels (e.g. persona) and the trace of the job currently running in this context
+_labels = contextvars.ContextVar('pulse_metric_labels', default=())
+_trace = contextvars.ContextVar('pulse_trace', default=None)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+class Trace:
+    """Spans recorded while one job runs, for its timing breakdown."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, labels):
+        with self._lock:
+            self.spans.append({'stage': name, 'seconds': seconds, **dict(labels)})
+
+    def summary(self):
+        """Total seconds and count per stage, overall and per persona."""
+        stages = {}
+        personas = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            for totals in [stages] + ([personas.setdefault(span['persona'], {})] if 'persona' in span else []):
+                entry = totals.setdefault(span['stage'], {'seconds': 0.0, 'count': 0})
+                entry['seconds'] += span['seconds']
+                entry['count'] += 1
+        return {'stages': stages, 'personas': personas}
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_noop_span = _NoopSpan()
+
+class _Span:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        labels = tuple(sorted(dict(_labels.get() + self.labels).items()))
+        self.metrics.observe('pulse_stage_seconds', seconds, stage=self.name, **dict(labels))
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(self.name, seconds, labels)
+        return False
+
+class Metrics:
+    """Counters, histograms and spans, exposed in Prometheus text format.
+
+    Disabled, every call returns immediately and span() hands back a shared
+    no-op context manager, so instrumentation costs next to nothing.
+    """
+
+    def __init__(self, enabled=False, buckets=default_buckets):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _noop_span
+        return _Span(self, name, tuple(labels.items()))
+
+    def current_labels(self):
+        return dict(_labels.get())
+
+    @contextmanager
+    def labels(self, **labels):
+        """Attach labels (e.g. persona=...) to every span and LLM metric in this block."""
+        token = _labels.set(_labels.get() + tuple(labels.items()))
+        try:
+            yield
+        finally:
+            _labels.reset(token)
+
+    @contextmanager
+    def trace(self):
+        trace = Trace()
+        token = _trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _trace.reset(token)
+
+    def bind(self, fn):
+        """Carry the current labels and trace into fn when it runs on another thread."""
+        labels = _labels.get()
+        trace = _trace.get()
+
+        def wrapper(*args, **kwargs):
+            labels_token = _labels.set(labels)
+            trace_token = _trace.set(trace)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _trace.reset(trace_token)
+                _labels.reset(labels_token)
+        return wrapper
+
+    def render_prometheus(self):
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ''
+            return '{' + ','.join(f'{k}="{escape_label(v)}"' for k, v in items) + '}'
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    lines.append(f'# TYPE {name} counter')
+                    seen.add(name)
+                lines.append(f'{name}{fmt(labels)} {value}')
+            for (name, labels), histogram in histograms:
+                if name not in seen:
+                    lines.append(f'# TYPE {name} histogram')
+                    seen.add(name)
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(f'{name}_bucket{fmt(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{fmt(labels, [("le", "+Inf")])} {histogram["count"]}')
+                lines.append(f'{name}_sum{fmt(labels)} {histogram["sum"]}')
+                lines.append(f'{name}_count{fmt(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(enabled=os.environ.get('PULSE_METRICS', '1') not in ('0', 'false', 'False', ''))
@@ -1,11 +1,30 @@
 import os, json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from uuid import uuid4
 from tinytroupe.factory import TinyPersonFactory
 from tinytroupe.extraction import ResultsExtractor
 from tinytroupe.agent import TinyPerson
+from backend.utils.population_store import PopulationStore, load_agent
+from backend.utils.llm import chat_json
+from backend.utils.metrics import metrics
+from backend.utils.ppt import count_tokens
 
 default_criteria = "Return an array of json objects."
 default_population_size = 5
+# Transcript tokens packed into one batched extraction request
+default_extraction_token_budget = 6000
+default_extraction_workers = 4
+# Stands in for stimuli every agent received (e.g. the deck) in batched extraction transcripts
+shared_stimulus_placeholder = "[The presentation shown to every agent]"
+default_analysis_prompt = """
+Given your background and expertise, analyze this presentation. Cover how clear and relevant the content
+is to you, what works well, what is missing or confusing, and what you would change.
+""".strip()
+default_qna_prompt = """
+Given your background and expertise, list the questions you would ask the presenter after this presentation,
+with the context for each question and why the answer matters to you.
+""".strip()
 
 class Persona:
     def __init__(self, persona_type=None, persona_description=None, persona_id=None, population_size = default_population_size, persona_folder=None):
@@ -23,11 +42,17 @@ class Persona:
             }
             self.factory: TinyPersonFactory = None
             self.population:list[TinyPerson] = []
+            self.population_store: PopulationStore = None
+            # True while only some members of the stored population are loaded
+            self.partial_population = False
             print(f"Persona created with id: {self.persona_spec['persona_id']} type: {self.persona_spec['persona_type']}, description: {self.persona_spec['persona_description']}")
         else:
             raise ValueError("Persona type and description or persona spec file must be provided to create a persona.")
 
     def load_persona(self, persona_folder):
+        self.factory: TinyPersonFactory = None
+        self.population_store: PopulationStore = None
+        self.partial_population = False
         persona_spec_file = f"{persona_folder}/persona_spec.json"
         if not os.path.exists(persona_spec_file):
             raise ValueError("Persona spec file not found in persona folder.")
@@ -39,15 +64,15 @@ class Persona:
             raise ValueError("Persona description not found in persona spec.")
         if not self.persona_spec.get('persona_id', None):
             raise ValueError("Persona id not found in persona spec.")
-        print(f"Persona loaded with id: {self.persona_spec['persona_id']} type: {self.persona_spec['type']}, description: {self.persona_spec['description']}")
+        print(f"Persona loaded with id: {self.persona_spec['persona_id']} type: {self.persona_spec['persona_type']}, description: {self.persona_spec['persona_description']}")
 
     def save_persona(self, persona_folder=None):
         if not persona_folder: persona_folder = f"persona_{self.persona_spec['persona_type'].replace(' ', '_')}_{self.persona_spec['persona_id']}"
         if not os.path.exists(persona_folder): os.makedirs(persona_folder)
 
+        self.save_population(self.persona_spec.get('population_folder') or f"{persona_folder}/population")
         persona_spec_file = f"{persona_folder}/persona_spec.json"
         self.save_specificatons(persona_spec_file)
-        self.save_population(self.persona_spec.get('population_folder', f"{persona_folder}/population"))
         
         return persona_folder
 
@@ -61,21 +86,57 @@ class Persona:
     def get_specification(self):
         return self.persona_spec
 
-    def load_population(self, population_folder=None):
+    def load_population(self, population_folder=None, names=None, include_memory=False):
+        """Load the population; with names, only those members are read from the store."""
         population_folder = self._get_folder('population_folder', population_folder)
         self.persona_spec['population_folder'] = population_folder
 
+        if PopulationStore.exists(population_folder):
+            self.population_store = PopulationStore(population_folder)
+            self.population = self.population_store.load_all(names, include_memory)
+            self.partial_population = names is not None
+            return self.population
+
+        # Legacy layout, one JSON file per member
         self.population = []
+        self.partial_population = False
         for file in os.listdir(population_folder):
             if file.endswith(".json"):
-                self.population.append(TinyPerson.load_specification(f"{population_folder}/{file}"))
+                with open(f"{population_folder}/{file}", "r", encoding='utf-8') as f:
+                    self.population.append(load_agent(json.load(f), include_memory=True))
         return self.population
-    
+
+    def get_member(self, name, include_memory=False):
+        """Return a population member by name, loading it from the store on first use."""
+        for member in self.population:
+            if member.name == name:
+                return member
+        if self.population_store is None or name not in self.population_store:
+            raise ValueError(f"Population member {name} not found.")
+        member = self.population_store.load(name, include_memory)
+        self.population.append(member)
+        self.partial_population = True
+        return member
+
     def save_population(self, population_folder=None, include_memory=False):
-        population_folder = self._get_folder('population_folder', population_folder)
-        for pop in self.population:
-            name = pop.get('name')
-            pop.save_specification(f"{population_folder}/{name.strip().replace(' ', '_')}.json", include_memory=include_memory)
+        """Save the population to the persona's population store (specs and memories kept apart).
+
+        A fully loaded or generated population becomes the store's membership; a
+        partially loaded one only updates its members, keeping the unloaded ones.
+        """
+        population_folder = population_folder or self.persona_spec.get('population_folder', None)
+        if not population_folder:
+            raise ValueError("population_folder not provided or found in persona_spec.")
+        if self.partial_population:
+            if self.population_store is None or self.population_store.store_folder != population_folder:
+                raise ValueError("Only part of the population is loaded; load it in full to save it elsewhere.")
+            self.population_store.append_many(self.population, include_memory=include_memory)
+        else:
+            if self.population_store is None or self.population_store.store_folder != population_folder:
+                self.population_store = PopulationStore(population_folder)
+            self.population_store.replace(self.population, include_memory=include_memory)
+        self.persona_spec['population_folder'] = population_folder
+        return population_folder
 
     def _get_folder(self, folder_name, folder=None):
         if not folder: folder = self.persona_spec.get(folder_name, None)
@@ -93,10 +154,10 @@ class Persona:
         self.persona_spec['prompts'] = {
             'persona_prompt': prompts_dict.get('persona_prompt', ''),
             'persona_gpt_prompt': prompts_dict.get('persona_gpt_prompt', ''),
-            'analysis_prompt': prompts_dict.get('analysis_prompt', ''),
+            'analysis_prompt': prompts_dict.get('analysis_prompt') or default_analysis_prompt,
             'analysis_gpt_prompt': prompts_dict.get('analysis_gpt_prompt', ''),
             'analysis_criteria': prompts_dict.get('analysis_criteria', default_criteria),
-            'qna_prompt': prompts_dict.get('qna_prompt', ''),
+            'qna_prompt': prompts_dict.get('qna_prompt') or default_qna_prompt,
             'qna_gpt_prompt': prompts_dict.get('qna_gpt_prompt', ''),
             'qna_criteria': prompts_dict.get('qna_criteria', default_criteria)
         }
@@ -115,19 +176,50 @@ class Persona:
     def change_population_size(self, population_size):
         self.persona_spec['population_size'] = population_size
 
+    def get_prompt(self, prompt_name):
+        return self.persona_spec.get('prompts', {}).get(prompt_name, None)
+
+    def analysis_prompt(self):
+        return self.get_prompt('analysis_prompt') or default_analysis_prompt
+
+    def qna_prompt(self):
+        return self.get_prompt('qna_prompt') or default_qna_prompt
+
     def create_factory(self):
-        persona_prompt = self.persona_spec.get('persona_prompt', None)
+        persona_prompt = self.get_prompt('persona_prompt') or self.persona_spec.get('persona_prompt', None)
         if not persona_prompt:
             raise ValueError("Persona prompt not found in persona spec.")
         return TinyPersonFactory(persona_prompt)
 
-    def create_population(self, force=False):
+    def create_population(self, force=False, on_progress=None, should_stop=None):
+        with metrics.labels(persona=self.persona_spec['persona_type']), metrics.span('population'):
+            return self._create_population(force, on_progress, should_stop)
+
+    def _create_population(self, force=False, on_progress=None, should_stop=None):
+        """Generate the population; returns None, leaving the current one alone, if should_stop fires."""
         if not force and self.population:
             raise ValueError("Population already exists. Use force=True to recreate population.")
         if not self.factory:
             self.factory = self.create_factory()
         population_size = self.persona_spec.get('population_size', default_population_size)
-        self.population = self.factory.generate_people(population_size)
+        if not on_progress and not should_stop:
+            self.population = self.factory.generate_people(population_size)
+            self.partial_population = False
+            return self.population
+
+        # Generate one person at a time so progress can be reported and a cancel honoured per member
+        population = []
+        for _ in range(population_size):
+            if should_stop and should_stop():
+                return None
+            person = self.factory.generate_person()
+            if person is None:
+                break
+            population.append(person)
+            if on_progress:
+                on_progress(self, len(population), population_size)
+        self.population = population
+        self.partial_population = False
         return self.population
 
     def analysis_result_extractor(self, extraction_objective=None, situation=None, fields=None, fields_hints=None, verbose=False):
@@ -137,10 +229,10 @@ class Persona:
             situation = "The agent was tasked with analyzing a powerpoint presentation to provide feedback on the content of the presentation and the presentation itself."
         if not fields:
             fields = ['analysis']
-        if not field_hints:
-            field_hints = {'analysis': self.persona_spec['prompts'].get('analysis_criteria', default_criteria)}
+        if not fields_hints:
+            fields_hints = {'analysis': self.persona_spec['prompts'].get('analysis_criteria', default_criteria)}
         return ResultsExtractor(extraction_objective=extraction_objective, situation=situation, 
-                                fields=fields, field_hints=field_hints, verbose=verbose)
+                                fields=fields, fields_hints=fields_hints, verbose=verbose)
     
     def qna_result_extractor(self, extraction_objective=None, situation=None, fields=None, fields_hints=None, verbose=False):
         if not extraction_objective:
@@ -149,7 +241,122 @@ class Persona:
             situation = "The agent was tasked with asking questions after analyzing powerpoint presentation, about the content of the presentation and the presentation itself."
         if not fields:
             fields = ['qna']
-        if not field_hints:
-            field_hints = {'qna': self.persona_spec['prompts'].get('qna_criteria', default_criteria)}
+        if not fields_hints:
+            fields_hints = {'qna': self.persona_spec['prompts'].get('qna_criteria', default_criteria)}
         return ResultsExtractor(extraction_objective=extraction_objective, situation=situation, 
-                                fields=fields, field_hints=field_hints, verbose=verbose)
+                                fields=fields, fields_hints=fields_hints, verbose=verbose)
+
+    def extraction_batches(self, agents, token_budget=default_extraction_token_budget, shared_stimuli=()):
+        """Pack (agent, transcript) pairs into batches of at most token_budget transcript tokens.
+
+        shared_stimuli (e.g. the broadcast deck) are replaced by a placeholder in
+        each transcript, so the budget goes to what the agents said.
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for agent in agents:
+            transcript = agent.pretty_current_interactions(max_content_length=None)
+            for stimulus in shared_stimuli:
+                transcript = transcript.replace(stimulus, shared_stimulus_placeholder)
+            tokens = count_tokens(transcript)
+            if current and current_tokens + tokens > token_budget:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append((agent, transcript))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def extraction_messages(self, batch, slide_numbers=None):
+        prompts = self.persona_spec['prompts']
+        slides = ""
+        entry = '"analysis": ..., "qna": ...'
+        if slide_numbers:
+            slides = f"""
+- "slides": for each of slides {', '.join(map(str, slide_numbers))}, what the agent said about that slide,
+  as {{"<slide number>": {{"analysis": ..., "qna": ...}}}} (empty values where it said nothing)"""
+            entry += ', "slides": ...'
+        transcripts = "\n\n".join(f"## Agent: {agent.name}\n{transcript}" for agent, transcript in batch)
+        return [
+            {'role': 'system', 'content': f"""
+You extract results from the interaction histories of several agents. Each agent was tasked with
+analyzing a powerpoint presentation and then asking questions about it.
+
+For every agent, extract:
+- "analysis": {prompts.get('analysis_criteria', default_criteria)}
+- "qna": {prompts.get('qna_criteria', default_criteria)}{slides}
+
+Respond only with a JSON object of the form {{"agents": {{"<agent name>": {{{entry}}}}}}},
+with one entry per agent, using the agent names exactly as given.
+""".strip()},
+            {'role': 'user', 'content': transcripts},
+        ]
+
+    def extract_results(self, agents, token_budget=default_extraction_token_budget,
+                        max_workers=default_extraction_workers, shared_stimuli=(), executor=None,
+                        slide_numbers=None):
+        """Extract analysis and Q&A for agents, several agents and both fields per LLM call.
+
+        Agents missing from a batched response, whose entry lacks a field, or whose
+        batch failed, fall back to the per-agent analysis and Q&A extractors.
+        Batches run on executor if given, else on a pool of max_workers threads.
+        With slide_numbers, what each agent said about each slide is extracted too.
+        Returns (analysis, qna, slides) lists aligned with agents: analysis and qna
+        shaped like extract_results_from_agents output, and per agent
+        {slide number: {'analysis', 'qna'}}, or None if not extracted.
+        """
+        def extract_batch(batch):
+            metrics.inc('pulse_extraction_calls_total', mode='batched')
+            try:
+                with metrics.span('batched_extraction'):
+                    response = chat_json(self.extraction_messages(batch, slide_numbers))
+            except Exception as e:
+                # One failed batch only costs its agents a per-agent extraction
+                print(f"Batched extraction failed for {len(batch)} agents: {e}")
+                metrics.inc('pulse_extraction_errors_total')
+                return {}
+            entries = response.get('agents') if isinstance(response, dict) else None
+            if not isinstance(entries, dict):
+                return {}
+            return {agent.name: entries[agent.name] for agent, _ in batch
+                    if isinstance(entries.get(agent.name), dict)
+                    and entries[agent.name].get('analysis') is not None
+                    and entries[agent.name].get('qna') is not None}
+
+        extracted = {}
+        batches = self.extraction_batches(agents, token_budget, shared_stimuli)
+        with (nullcontext(executor) if executor is not None
+              else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extraction')) as executor:
+            for entries in executor.map(metrics.bind(extract_batch), batches):
+                extracted.update(entries)
+
+        analysis = []
+        qna = []
+        slides = []
+        for agent in agents:
+            entry = extracted.get(agent.name)
+            slides.append(self.slide_entries(entry, slide_numbers))
+            if entry is None:
+                metrics.inc('pulse_extraction_calls_total', 2, mode='fallback')
+                with metrics.span('result_extraction_fallback'):
+                    entry = {
+                        'analysis': (self.analysis_result_extractor().extract_results_from_agent(agent) or {}).get('analysis'),
+                        'qna': (self.qna_result_extractor().extract_results_from_agent(agent) or {}).get('qna'),
+                    }
+            analysis.append({'analysis': entry['analysis']})
+            qna.append({'qna': entry['qna']})
+        return analysis, qna, slides
+
+    @staticmethod
+    def slide_entries(entry, slide_numbers):
+        """{slide number: review} from an extracted entry, or None if it has no per-slide results."""
+        if not slide_numbers or entry is None or not isinstance(entry.get('slides'), dict):
+            return None
+        reviews = {}
+        for number in slide_numbers:
+            review = entry['slides'].get(str(number))
+            reviews[number] = review if isinstance(review, dict) else {}
+        return reviews
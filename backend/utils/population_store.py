@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import threading
+from tinytroupe.agent import TinyPerson
+
+MEMORY_ATTRIBUTES = ['episodic_memory', 'semantic_memory']
+SPECS_FILE = 'population.jsonl'
+MEMORIES_FILE = 'memories.jsonl'
+INDEX_FILE = 'population.index.json'
+
+def spec_json(agent):
+    """The agent's spec as the store saves it, without memories."""
+    return agent.to_json(suppress=MEMORY_ATTRIBUTES, serialization_type_field_name="type")
+
+def load_agent(spec, name=None, include_memory=False):
+    """Load an agent from its spec, reusing the live agent of that name only if it is the same agent.
+
+    TinyTroupe allows one agent per name, so reloading a saved population that
+    is still in memory (e.g. to revise a deck) would otherwise fail. A live
+    agent is reused when its spec matches the record and no memory is asked
+    for; otherwise the record takes over the name and is loaded afresh.
+    """
+    name = name or (spec.get('persona') or spec.get('_persona') or {}).get('name')
+    agent = TinyPerson.get_agent_by_name(name) if name else None
+    if agent is not None:
+        record = {k: v for k, v in spec.items() if k not in MEMORY_ATTRIBUTES}
+        if not include_memory and record_hash(spec_json(agent)) == record_hash(record):
+            return agent
+        # A different agent (e.g. another persona's) under the same name, or one whose memory we need:
+        # unregister it; whoever holds it can keep using it
+        TinyPerson.all_agents.pop(name, None)
+    return TinyPerson.load_specification(spec, suppress_memory=not include_memory)
+
+def record_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+class PopulationStore:
+    """All members of a persona in one append-only JSONL file with an offset index.
+
+    Specs and memories live in separate files, so a spec-only load never reads
+    memories. Members are loaded lazily by name; saving a member again appends
+    a new record and repoints the index instead of rewriting the file, and a
+    member saved unchanged is not appended at all. The index also records the
+    current membership, so records of replaced members stay on disk (until the
+    next compaction) without being loaded.
+    """
+
+    # Compact once the files hold this many times the bytes of the current records
+    compact_ratio = 2
+
+    def __init__(self, store_folder):
+        self.store_folder = store_folder
+        os.makedirs(store_folder, exist_ok=True)
+        self.specs_path = os.path.join(store_folder, SPECS_FILE)
+        self.memories_path = os.path.join(store_folder, MEMORIES_FILE)
+        self.index_path = os.path.join(store_folder, INDEX_FILE)
+        self._lock = threading.Lock()
+        self.members, self.index = self._load_index()
+
+    @staticmethod
+    def exists(store_folder):
+        return os.path.exists(os.path.join(store_folder, SPECS_FILE))
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if 'records' in index:
+                return index['members'], index['records']
+            return list(index), index  # index without membership, every record is a member
+        records = self._rebuild_index()
+        return list(records), records
+
+    def _rebuild_index(self):
+        """Scan the JSONL files; the last record for a name wins."""
+        index = {}
+        for kind, path in (('spec', self.specs_path), ('memory', self.memories_path)):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        entry = index.setdefault(record['name'], {})
+                        entry[kind] = [offset, len(line)]
+                        entry[f"{kind}_hash"] = record_hash(record['data'])
+                    offset += len(line)
+        return index
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'members': self.members, 'records': self.index}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _append(self, path, record):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with open(path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+        return [offset, len(line)]
+
+    def _read(self, path, location):
+        offset, length = location
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))['data']
+
+    def names(self):
+        return list(self.members)
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def __len__(self):
+        return len(self.members)
+
+    def append(self, agent:TinyPerson, include_memory=False):
+        self.append_many([agent], include_memory)
+
+    def append_many(self, agents, include_memory=False):
+        """Add agents to the population, writing only records that changed."""
+        with self._lock:
+            self._write(agents, include_memory)
+            self.members += [agent.name for agent in agents if agent.name not in self.members]
+            self._save()
+
+    def replace(self, agents, include_memory=False):
+        """Make agents the whole population, e.g. after it was regenerated."""
+        with self._lock:
+            self._write(agents, include_memory)
+            self.members = [agent.name for agent in agents]
+            self._save()
+
+    def _write(self, agents, include_memory):
+        for agent in agents:
+            entry = self.index.setdefault(agent.name, {})
+            records = [('spec', self.specs_path, spec_json(agent))]
+            if include_memory:
+                records.append(('memory', self.memories_path, agent.to_json(include=MEMORY_ATTRIBUTES,
+                                                                            serialization_type_field_name="type")))
+            for kind, path, data in records:
+                digest = record_hash(data)
+                if entry.get(kind) and entry.get(f"{kind}_hash") == digest:
+                    continue
+                entry[kind] = self._append(path, {'name': agent.name, 'data': data})
+                entry[f"{kind}_hash"] = digest
+
+    def _save(self):
+        if self._needs_compaction():
+            self._compact()
+        self._save_index()
+
+    def _needs_compaction(self):
+        live = sum(entry[kind][1] for name, entry in self.index.items() if name in self.members
+                   for kind in ('spec', 'memory') if kind in entry)
+        stored = sum(os.path.getsize(path) for path in (self.specs_path, self.memories_path) if os.path.exists(path))
+        return stored > max(live, 1) * self.compact_ratio
+
+    def compact(self):
+        """Rewrite the files with only the current members' latest records."""
+        with self._lock:
+            self._compact()
+            self._save_index()
+
+    def _compact(self):
+        index = {}
+        for kind, path in (('spec', self.specs_path), ('memory', self.memories_path)):
+            if not os.path.exists(path):
+                continue
+            tmp_path = f"{path}.tmp"
+            with open(path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for name in self.members:
+                    entry = self.index.get(name, {})
+                    if kind not in entry:
+                        continue
+                    offset, length = entry[kind]
+                    source.seek(offset)
+                    index.setdefault(name, {})[kind] = [target.tell(), length]
+                    index[name][f"{kind}_hash"] = entry.get(f"{kind}_hash")
+                    target.write(source.read(length))
+            os.replace(tmp_path, path)
+        self.index = index
+
+    def load_spec(self, name, include_memory=False):
+        entry = self.index.get(name) if name in self.members else None
+        if entry is None or 'spec' not in entry:
+            raise ValueError(f"Population member {name} not found in {self.store_folder}.")
+        spec = self._read(self.specs_path, entry['spec'])
+        if include_memory and 'memory' in entry:
+            spec.update({k: v for k, v in self._read(self.memories_path, entry['memory']).items()
+                         if k in MEMORY_ATTRIBUTES})
+        return spec
+
+    def load(self, name, include_memory=False):
+        return load_agent(self.load_spec(name, include_memory), name, include_memory)
+
+    def load_all(self, names=None, include_memory=False):
+        return [self.load(name, include_memory) for name in (names or self.names())]
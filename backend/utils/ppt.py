@@ -1,7 +1,55 @@
+import hashlib
+import re
+from pptx_extractor import slides_from_json, slides_to_json
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional, fall back to a character estimate
+    _encoding = None
+
+default_token_budget = 3000
+slide_separator = '\n\n--------\n'
+
+# Notes lines added by PowerPoint Designer / Copilot that carry no content
+BOILERPLATE_NOTES = [
+    re.compile(r'^AI-generated content may be incorrect\.?$', re.IGNORECASE),
+    re.compile(r'^Image source:.*$', re.IGNORECASE),
+    re.compile(r'^-{3,}$'),
+]
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+def clean_notes(notes):
+    """Drop boilerplate lines and the trailing slide number from speaker notes."""
+    lines = [line for line in notes.strip().split('\n')
+             if not any(pattern.match(line.strip()) for pattern in BOILERPLATE_NOTES)]
+    while lines and (not lines[-1].strip() or lines[-1].strip().isdigit()):
+        lines.pop()
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+def slide_hash(slide):
+    """Hash of what a slide says, independent of where it sits in the deck."""
+    content = '\0'.join((slide.title, slide.body, clean_notes(slide.notes)))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
 class PPT:
-    def __init__(self, ppt_details, ppt_json):
+    def __init__(self, ppt_details, slides):
+        # slides: Slide records, or their JSON form from the slide store or a pulse spec
         self.ppt_details = ppt_details
-        self.ppt_json = ppt_json
+        self.slides = [slide for slide in slides_from_json(slides) if slide.has_content()]
+        self.slides_by_index = {slide.index: slide for slide in self.slides}
+
+    @property
+    def ppt_json(self):
+        return slides_to_json(self.slides)
+
+    @property
+    def slide_count(self):
+        return self.slides[-1].index if self.slides else 0
 
     def ppt_details_prompt(self):
         return f"""
@@ -10,15 +58,67 @@ Presentation Description: {self.ppt_details.get('description', '')}
 Presentation Intent: {self.ppt_details.get('intent', '')}
 Presentation Audience: {self.ppt_details.get('audience', '')}
 """
-    
-    def slide_content_prompt(self):
-        slides = []
-        for i in range(1,len(self.ppt_json.keys())+1):
-            slideNo = f"slide{i}"
-            slide_content = f"""
-                Slide {i}
-                Slide Text: {self.ppt_json[slideNo].get('text', 'No Text')}
-                Slide Notes: {self.ppt_json[slideNo].get('notes', 'No Notes')}
+
+    @staticmethod
+    def slide_prompt(slide):
+        notes = clean_notes(slide.notes) or 'No Notes'
+        slide_content = f"""
+                Slide {slide.index}
+                Slide Title: {slide.title or 'No Title'}
+                Slide Text: {slide.body or 'No Text'}
+                Slide Notes: {notes}
             """
-            slides.append(slide_content.strip())
-        return "Presentation content:\n\n"'\n\n--------\n'.join(slides)
\ No newline at end of file
+        return slide_content.strip()
+
+    def slide_prompts(self):
+        """(slide index, prompt) for every slide, in order."""
+        return [(slide.index, self.slide_prompt(slide)) for slide in self.slides]
+
+    @staticmethod
+    def content_prompt(prompts):
+        return "Presentation content:\n\n" + slide_separator.join(prompts)
+
+    def slide_content_prompt(self):
+        return self.content_prompt([prompt for _, prompt in self.slide_prompts()])
+
+    def slide_hashes(self):
+        """{slide index: content hash}, in deck order."""
+        return {slide.index: slide_hash(slide) for slide in self.slides}
+
+    def content_tokens(self):
+        return count_tokens(self.slide_content_prompt())
+
+    def slide_chunks(self, token_budget=default_token_budget, slide_numbers=None):
+        """Split the deck (or just slide_numbers) into runs of at most token_budget tokens.
+
+        A single slide larger than the budget gets a chunk of its own.
+        Returns a list of lists of slide indexes.
+        """
+        if slide_numbers is None:
+            prompts = self.slide_prompts()
+        else:
+            prompts = [(i, self.slide_prompt(self.slides_by_index[i])) for i in slide_numbers]
+        chunks = []
+        current = []
+        current_tokens = 0
+        for slide_number, prompt in prompts:
+            tokens = count_tokens(prompt)
+            if current and current_tokens + tokens > token_budget:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(slide_number)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def chunk_content_prompt(self, slide_numbers):
+        prompts = [self.slide_prompt(self.slides_by_index[i]) for i in slide_numbers]
+        if len(slide_numbers) == 1:
+            slides = f"slide {slide_numbers[0]}"
+        elif list(slide_numbers) == list(range(slide_numbers[0], slide_numbers[-1] + 1)):
+            slides = f"slides {slide_numbers[0]}-{slide_numbers[-1]}"
+        else:
+            slides = f"slides {', '.join(map(str, slide_numbers))}"
+        return f"Presentation content ({slides} of {self.slide_count}):\n\n" + slide_separator.join(prompts)
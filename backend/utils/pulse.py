@@ -1,26 +1,118 @@
+import hashlib
 import json
-from tinytroupe.environment import TinyWorld
+import os
+import time
+from contextlib import nullcontext
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from backend.utils.persona import Persona
-from backend.utils.ppt import PPT
+from backend.utils.ppt import PPT, default_token_budget
+from backend.utils.llm import chat_json
+from backend.utils.metrics import metrics
+from backend.utils.snapshot import PopulationSnapshot
 from uuid import uuid4
 
+default_population_size = 5
+default_max_workers = 5
+
+# 'world' broadcasts the whole deck to a TinyWorld; 'map_reduce' reviews budget-sized
+# chunks of slides in parallel and merges them; 'auto' picks map_reduce for large decks
+ANALYSIS_MODES = ('auto', 'world', 'map_reduce')
+
+def generate_prompt(ppt_details_prompt, content):
+    return f"""
+Perform a review of a powerpoint presentation with the following details
+{ppt_details_prompt}
+
+{content}
+""".strip()
+
+def generate_neutral_prompt(content):
+    """Like generate_prompt, without the details of any one presentation."""
+    return f"""
+Perform reviews of powerpoint presentations
+
+{content}
+""".strip()
+
 class Pulse:
 
-    default_population_size = 5
+    default_population_size = default_population_size
 
-    def __init__(self, name:str=None, ppt:PPT=None, pulse_id=None, 
-                 pulse_folder=None, load_from_folder=False):
+    def __init__(self, name:str=None, ppt:PPT=None, pulse_id=None,
+                 pulse_folder=None, load_from_folder=False,
+                 analysis_mode='auto', token_budget=default_token_budget):
+        if analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {analysis_mode}")
         self.name = name
         self.pulse_id = pulse_id if pulse_id else str(uuid4())
         self.ppt = ppt
+        self.pulse_folder = pulse_folder
+        self.analysis_mode = analysis_mode
+        self.token_budget = token_budget
+        # Pulse this one revises, if any
+        self.base_pulse_id = None
+
+        # Reviews kept for incremental re-analysis, per persona ID: each agent's review
+        # of each slide by the slide's content hash, and the merged reviews
+        self.slide_reviews = {}
+        self.merged_reviews = {}
+        # Per persona ID, snapshots of the population as generated, and after it has taken in the deck
+        self.population_snapshots = {}
+        self.primed = {}
 
         self.personas = {}
+        if pulse_folder and load_from_folder:
+            self.load_pulse_from_folder(pulse_folder)
+
+    @staticmethod
+    def ppt_from_run_request(data, ppt_json):
+        ppt_details = {
+            'title': data.get('ppt_title', ''),
+            'description': data.get('ppt_description', ''),
+            'intent': data.get('ppt_intent', ''),
+            'audience': data.get('ppt_audience', ''),
+        }
+        return PPT(ppt_details, ppt_json)
+
+    @classmethod
+    def from_run_request(cls, data, ppt_json, describe_deck=True):
+        """Build a pulse from a /run_analysis request body and the uploaded slides.
+
+        With describe_deck=False the personas are not described in terms of
+        this deck, for populations that review several decks.
+        """
+        ppt = cls.ppt_from_run_request(data, ppt_json)
+        pulse = cls(name=data.get('ppt_name') or ppt.ppt_details['title'], ppt=ppt,
+                    analysis_mode=data.get('analysis_mode') or 'auto',
+                    token_budget=data.get('token_budget') or default_token_budget)
+        for persona_data in data.get('personas', []):
+            persona = Persona(persona_data['name'], persona_data['description'],
+                              persona_id=persona_data.get('id'),
+                              population_size=persona_data.get('population_size') or default_population_size)
+            analysis = persona_data.get('analysis') or {}
+            qna = persona_data.get('qna') or {}
+            persona.load_prompts({
+                'persona_prompt': persona_data.get('persona_prompt', ''),
+                'persona_gpt_prompt': persona_data.get('persona_gpt_prompt', ''),
+                'analysis_prompt': analysis.get('analysis_prompt', ''),
+                'analysis_gpt_prompt': analysis.get('analysis_gpt_prompt', ''),
+                'qna_prompt': qna.get('qna_prompt', ''),
+                'qna_gpt_prompt': qna.get('qna_gpt_prompt', ''),
+            })
+            pulse.add_persona(persona, describe_deck)
+        return pulse
 
     def load_pulse_spec(self, pulse_spec_file):
         pulse_spec = json.load(open(pulse_spec_file, "r", encoding='utf-8'))
         self.name = pulse_spec.get('name', None)
         self.pulse_id = pulse_spec.get('pulse_id', None)
         self.ppt = PPT(pulse_spec.get('ppt_details', None), pulse_spec.get('ppt_json', None))
+        self.analysis_mode = pulse_spec.get('analysis_mode', self.analysis_mode)
+        self.token_budget = pulse_spec.get('token_budget', self.token_budget)
+        self.base_pulse_id = pulse_spec.get('base_pulse_id')
+        self.slide_reviews = pulse_spec.get('slide_reviews', {})
+        self.merged_reviews = pulse_spec.get('merged_reviews', {})
 
     def save_pulse_spec(self, pulse_spec_file):
         pulse_spec = {
@@ -28,25 +120,474 @@ class Pulse:
             'pulse_id': self.pulse_id,
             'ppt_details': self.ppt.ppt_details,
             'ppt_json': self.ppt.ppt_json,
+            'analysis_mode': self.analysis_mode,
+            'token_budget': self.token_budget,
+            'base_pulse_id': self.base_pulse_id,
+            'slide_hashes': list(self.ppt.slide_hashes().items()),
+            'slide_reviews': self.slide_reviews,
+            'merged_reviews': self.merged_reviews,
         }
         with open(pulse_spec_file, "w", encoding='utf-8') as f:
             json.dump(pulse_spec, f, indent=4)
 
+    def save_pulse(self, pulse_folder=None):
+        """Save the spec, reviews and personas (with their populations) to pulse_folder."""
+        self.pulse_folder = pulse_folder or self.pulse_folder or f"pulse_{self.pulse_id}"
+        os.makedirs(self.pulse_folder, exist_ok=True)
+        for persona in self.personas.values():
+            persona.save_persona(os.path.join(self.pulse_folder, f"persona_{persona.persona_spec['persona_id']}"))
+        self.save_pulse_spec(f"{self.pulse_folder}/pulse_spec.json")
+        return self.pulse_folder
+
     def load_pulse_from_folder(self, pulse_folder):
+        self.pulse_folder = pulse_folder
         self.load_pulse_spec(f"{self.pulse_folder}/pulse_spec.json")
-        for file in os.listdir(self.pulse_folder):
-            if file.endswith(".json") and file != "pulse_spec.json":
-                persona = Persona.load_persona_specification(f"{self.pulse_folder}/{file}")
-                self.personas.append(persona)
+        self.load_personas(self.pulse_folder)
+
+    def add_persona(self, persona:Persona, describe_deck=True):
+        # Personas generated for this pulse are described in terms of the presentation
+        if not persona.get_prompt('persona_prompt'):
+            description = persona.persona_spec['persona_description']
+            persona.update_prompts({'persona_prompt': generate_prompt(self.ppt.ppt_details_prompt(), description)
+                                    if describe_deck else generate_neutral_prompt(description)})
+        self.personas[persona.persona_spec['persona_id']] = persona
+        return persona
+
+    def create_persona(self, persona_type, persona_description, population_size=default_population_size,
+                       prompts=None):
+        persona = Persona(persona_type, persona_description, population_size=population_size)
+        persona.load_prompts(prompts)
+        return self.add_persona(persona)
+
+    def load_personas(self, persona_folder):
+        for folder in sorted(os.listdir(persona_folder)):
+            folder = os.path.join(persona_folder, folder)
+            if os.path.isfile(os.path.join(folder, "persona_spec.json")):
+                self.add_persona(Persona(persona_folder=folder))
+        return self.personas
+
+    def start_prompt(self):
+        return generate_prompt(self.ppt.ppt_details_prompt(), self.ppt.slide_content_prompt())
+
+    def resolved_analysis_mode(self):
+        if self.analysis_mode != 'auto':
+            return self.analysis_mode
+        return 'map_reduce' if self.ppt.content_tokens() > self.token_budget else 'world'
+
+    def revise(self, ppt:PPT):
+        """Switch this pulse to a new version of its deck; returns the slide diff.
+
+        Slides are matched by content hash, so moved slides count as unchanged.
+        'removed' lists indexes in the previous version, the rest indexes in ppt.
+        Revisions are reviewed in map-reduce mode, where reviews of unchanged
+        slides are reused (see plan_reviews). The revision gets its own
+        pulse ID and folder, so saving it leaves the previous version intact.
+        """
+        old = list(self.ppt.slide_hashes().items())
+        self.base_pulse_id = self.pulse_id
+        self.pulse_id = str(uuid4())
+        self.pulse_folder = None
+        self.ppt = ppt
+        self.analysis_mode = 'map_reduce'
+        self.primed = {}
+        new = list(self.ppt.slide_hashes().items())
+        old_hashes = {h for _, h in old}
+        new_hashes = {h for _, h in new}
+
+        diff = {'unchanged': [], 'changed': [], 'added': [], 'removed': []}
+        matcher = SequenceMatcher(None, [h for _, h in old], [h for _, h in new], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                diff['unchanged'].extend(index for index, _ in new[j1:j2])
+                continue
+            # Replaced slides pair up one to one; moved slides are neither changed nor removed
+            gone = [index for index, h in old[i1:i2] if h not in new_hashes]
+            replaced = 0
+            for index, h in new[j1:j2]:
+                if h in old_hashes:
+                    diff['unchanged'].append(index)
+                elif replaced < len(gone):
+                    diff['changed'].append(index)
+                    replaced += 1
+                else:
+                    diff['added'].append(index)
+            diff['removed'].extend(gone[replaced:])
+        return diff
+
+    def review_context(self, persona:Persona):
+        """Hash of what shapes a slide review besides the slide: deck details and the persona's review prompts."""
+        prompts = persona.get_specification().get('prompts', {})
+        content = '\0'.join((self.ppt.ppt_details_prompt(), persona.analysis_prompt(), persona.qna_prompt(),
+                             prompts.get('analysis_criteria', ''), prompts.get('qna_criteria', '')))
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+    def stored_reviews(self, persona_id, context):
+        """{slide hash: {agent name: review}} stored for the persona under context."""
+        return {slide_hash: entry['reviews'] for slide_hash, entry in self.slide_reviews.get(persona_id, {}).items()
+                if entry.get('context') == context}
+
+    def store_reviews(self, persona_id, context, reviews):
+        """Keep {(agent name, slide index): review} by slide content hash, for the slides of this deck."""
+        hashes = self.ppt.slide_hashes()
+        stored = {slide_hash: entry for slide_hash, entry in self.slide_reviews.get(persona_id, {}).items()
+                  if slide_hash in hashes.values() and entry.get('context') == context}
+        for (name, index), review in reviews.items():
+            stored.setdefault(hashes[index], {'context': context, 'reviews': {}})['reviews'][name] = review
+        self.slide_reviews[persona_id] = stored
+
+    def plan_reviews(self, persona_id, agent_names, context=None):
+        """Work left to review the deck per slide, reusing reviews of unchanged slides.
+
+        Only reviews made under the same context (see review_context) are reused.
+        Returns (reused, chunks): reused maps (agent name, slide index) to a stored
+        review, and chunks maps each agent name to the slides it still has to
+        review, split into runs of at most the token budget.
+        """
+        hashes = self.ppt.slide_hashes()
+        stored = self.stored_reviews(persona_id, context)
+        reused = {}
+        chunks = {}
+        for name in agent_names:
+            pending = []
+            for index, slide_hash in hashes.items():
+                review = stored.get(slide_hash, {}).get(name)
+                if review is None:
+                    pending.append(index)
+                else:
+                    reused[(name, index)] = review
+            chunks[name] = self.ppt.slide_chunks(self.token_budget, pending) if pending else []
+        return reused, chunks
+
+    def run_persona(self, persona:Persona, should_stop=None, executor=None):
+        """Run the review for one persona; returns its result, or None if stopped early.
+
+        executor, if given, runs the chunk reviews and extraction batches instead
+        of pools of their own.
+        """
+        with metrics.labels(persona=persona.persona_spec['persona_type']):
+            return self._run_persona(persona, should_stop, executor)
+
+    def _run_persona(self, persona:Persona, should_stop=None, executor=None):
+        if not persona.population:
+            persona.create_population(should_stop=should_stop)
+        if should_stop and should_stop():
+            return None
+        persona_id = persona.persona_spec['persona_id']
+        if self.resolved_analysis_mode() == 'map_reduce' or self.slide_reviews.get(persona_id):
+            return self.map_reduce_persona(persona, should_stop=should_stop, executor=executor)
+
+        primed = self.prime_persona(persona)
+        with metrics.span('world_run'), primed.fork('review') as fork:
+            agents = fork.run(persona.analysis_prompt(), persona.qna_prompt())
+        if should_stop and should_stop():
+            return None
+
+        with metrics.span('result_extraction'):
+            slide_numbers = list(self.ppt.slide_hashes())
+            analysis, qna, slides = persona.extract_results(agents, shared_stimuli=[self.start_prompt()],
+                                                            executor=executor, slide_numbers=slide_numbers)
+        # Keep what each agent said per slide (and overall), so a revision only reviews changed slides
+        context = self.review_context(persona)
+        self.store_reviews(persona_id, context, {
+            (member.name, index): review
+            for member, reviews in zip(persona.population, slides) if reviews for index, review in reviews.items()})
+        self.merged_reviews[persona_id] = {
+            'slides': list(self.ppt.slide_hashes().values()), 'context': context,
+            'reviews': {member.name: {'analysis': a.get('analysis'), 'qna': q.get('qna')}
+                        for member, a, q in zip(persona.population, analysis, qna)}}
+        return self.persona_result(persona, analysis, qna)
+
+    def prime_persona(self, persona:Persona):
+        """Snapshot of the persona's population once it has taken in the deck, made on first use."""
+        persona_id = persona.persona_spec['persona_id']
+        if persona_id not in self.primed:
+            if not persona.population:
+                persona.create_population()
+            # Prime copies, so the population itself stays clean for other decks and for saving
+            with metrics.span('prime'), self.population_snapshot(persona).fork(
+                    f"{persona_id} {self.pulse_id} deck") as fork:
+                self.primed[persona_id] = PopulationSnapshot.prime(fork, [self.start_prompt()])
+        return self.primed[persona_id]
 
-    def create_persona(self, persona_type, persona_guidelines, population_size=default_population_size,
-                 prompt_folder=None, generate_from_prompt_folder=False,
-                 persona_folder=None, load_persona_from_persona_folder=False):
-        return Persona(persona_type, persona_guidelines, 
-                       self.ppt, population_size, 
-                       prompt_folder, generate_from_prompt_folder, 
-                       persona_folder, load_persona_from_persona_folder)
+    def population_snapshot(self, persona:Persona):
+        persona_id = persona.persona_spec['persona_id']
+        if persona_id not in self.population_snapshots:
+            if not persona.population:
+                persona.create_population()
+            self.population_snapshots[persona_id] = PopulationSnapshot(persona.population)
+        return self.population_snapshots[persona_id]
 
-    def load_personas(self, persona_spec_file, persona_folder):
+    def run_rounds(self, persona:Persona, rounds, max_workers=default_max_workers):
+        """Run independent follow-up rounds concurrently from the primed population.
 
+        rounds maps a label to a list of prompts (e.g. a reviewer question or a
+        changed intent). Each round runs on its own fork, so none re-reads the deck
+        or sees the others' memory. Returns {label: agents after the round}.
+        """
+        primed = self.prime_persona(persona)
 
+        def run_round(label):
+            with metrics.span('round'), primed.fork(label) as fork:
+                return fork.run(*rounds[label])
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='round') as executor:
+            return dict(zip(rounds, executor.map(metrics.bind(run_round), rounds)))
+
+    def agent_messages(self, persona:Persona, agent, content, slide_numbers=None):
+        """Messages for one agent's review; with slide_numbers, a separate review of each of those slides."""
+        prompts = persona.get_specification().get('prompts', {})
+        if slide_numbers:
+            respond = (f'Review each of slides {", ".join(map(str, slide_numbers))} on its own. Respond only with '
+                       'a JSON object of the form {"slides": {"<slide number>": {"analysis": ..., "qna": ...}}}.')
+        else:
+            respond = 'Respond only with a JSON object with the keys "analysis" and "qna".'
+
+        return [
+            {'role': 'system', 'content': f"""
+You are {agent.name}. {agent.minibio()}
+Stay in character and review the presentation from your own perspective.
+
+Analysis task:
+{persona.analysis_prompt()}
+Analysis format: {prompts.get('analysis_criteria', '')}
+
+Questions task:
+{persona.qna_prompt()}
+Questions format: {prompts.get('qna_criteria', '')}
+
+{respond}
+""".strip()},
+            {'role': 'user', 'content': content},
+        ]
+
+    def map_reduce_persona(self, persona:Persona, max_workers=default_max_workers, should_stop=None, executor=None):
+        """Review the deck slide by slide in token-budgeted chunks, then merge each agent's reviews.
+
+        Each (agent, chunk) review is an independent LLM call run in parallel, so cost
+        and latency grow linearly with deck size instead of overflowing the context.
+        Reviews are stored per slide content hash and reused for unchanged slides,
+        and merges are reused when no slide changed, so a revised deck only costs
+        its changes, however few chunks it fits in.
+        The calls run on executor if given, else on a pool of max_workers threads.
+        """
+        persona_id = persona.persona_spec['persona_id']
+        context = self.review_context(persona)
+        hashes = self.ppt.slide_hashes()
+        agents = persona.population
+
+        previous_merge = self.merged_reviews.get(persona_id) or {}
+        merged = [None] * len(agents)
+        if previous_merge.get('context') == context and previous_merge.get('slides') == list(hashes.values()):
+            merged = [previous_merge['reviews'].get(agent.name) for agent in agents]
+        # Agents whose merged review is reused need no slide reviews
+        pending = [agent.name for agent, review in zip(agents, merged) if review is None]
+        reviews, chunks = self.plan_reviews(persona_id, pending, context)
+        reused_reviews = len(reviews)
+
+        def review_chunk(agent, chunk):
+            content = generate_prompt(self.ppt.ppt_details_prompt(), self.ppt.chunk_content_prompt(chunk))
+            response = chat_json(self.agent_messages(persona, agent, content, slide_numbers=chunk)) or {}
+            slides = response.get('slides') if isinstance(response.get('slides'), dict) else {}
+            return {i: slides.get(str(i)) if isinstance(slides.get(str(i)), dict) else {} for i in chunk}
+
+        def merge(agent):
+            parts = "\n\n".join(f"Slide {i}:\n{json.dumps(reviews[(agent.name, i)], ensure_ascii=False)}"
+                                  for i in hashes)
+            content = generate_prompt(self.ppt.ppt_details_prompt(), f"""
+You reviewed this presentation slide by slide. Your reviews of each slide are below.
+Merge them into one review of the whole presentation, removing repetition.
+
+{parts}
+""".strip())
+            return chat_json(self.agent_messages(persona, agent, content)) or {}
+
+        with (nullcontext(executor) if executor is not None
+              else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='map-reduce')) as executor:
+            with metrics.span('map'):
+                review_chunk = metrics.bind(review_chunk)
+                futures = [(agent.name, executor.submit(review_chunk, agent, chunk))
+                           for agent in agents for chunk in chunks.get(agent.name, [])]
+                new_reviews = {}
+                for name, future in futures:
+                    new_reviews.update({(name, i): review for i, review in future.result().items()})
+                reviews.update(new_reviews)
+            if should_stop and should_stop():
+                return None
+            with metrics.span('reduce'):
+                missing = [i for i, review in enumerate(merged) if review is None]
+                merge_agent = metrics.bind(lambda i: merge(agents[i]))
+                for i, review in zip(missing, executor.map(merge_agent, missing)):
+                    merged[i] = review
+
+        metrics.inc('pulse_slide_reviews_total', reused_reviews, result='reused')
+        metrics.inc('pulse_slide_reviews_total', len(new_reviews), result='new')
+        self.store_reviews(persona_id, context, reviews)
+        self.merged_reviews[persona_id] = {'slides': list(hashes.values()), 'context': context,
+                                           'reviews': {agent.name: m for agent, m in zip(agents, merged)}}
+
+        result = self.persona_result(persona,
+                                     [{'analysis': m.get('analysis')} for m in merged],
+                                     [{'qna': m.get('qna')} for m in merged])
+        reviewed = {i for _, i in new_reviews}
+        result['revision'] = {
+            'reused_slides': [i for i in hashes if i not in reviewed],
+            'reviewed_slides': [i for i in hashes if i in reviewed],
+            'reused_reviews': reused_reviews,
+            'new_reviews': len(new_reviews),
+            'review_calls': len(futures),
+            'new_merges': len(missing),
+        }
+        return result
+
+    def persona_result(self, persona:Persona, analysis, qna):
+        """Shape one persona's extracted results the way the frontend expects them."""
+        spec = persona.get_specification()
+        result = {
+            'id': spec['persona_id'],
+            'name': spec['persona_type'],
+            'description': spec['persona_description'],
+            'population_size': spec.get('population_size', default_population_size),
+            'agents': [agent.minibio() for agent in persona.population],
+        }
+        for field, results in (('analysis', analysis), ('qna', qna)):
+            extracted = {}
+            combined = []
+            for agent, agent_result in zip(persona.population, results or []):
+                value = (agent_result or {}).get(field)
+                extracted[agent.name] = value
+                combined.append({'Agent': agent.name, field.capitalize(): value})
+            result[field] = {
+                f'{field}_prompt': persona.get_prompt(f'{field}_prompt'),
+                'extracted_result': extracted,
+                'combined_result': json.dumps(combined, ensure_ascii=False),
+            }
+        return result
+
+    def create_populations(self, max_workers=default_max_workers, on_progress=None, force=False, should_stop=None):
+        """Generate the populations of all personas concurrently.
+
+        LLM calls are paced by the shared rate limiter of the installed client, so
+        wall-clock time approaches that of the slowest persona. on_progress gets a
+        dict per generated member and per finished persona. should_stop is checked
+        between members; personas it interrupts keep their previous population.
+        """
+        personas = [p for p in self.personas.values() if force or not p.population]
+        if not personas:
+            return {}
+        start = time.perf_counter()
+
+        def report(persona, generated, population_size, status='generating'):
+            if on_progress:
+                on_progress({
+                    'persona_id': persona.persona_spec['persona_id'],
+                    'name': persona.persona_spec['persona_type'],
+                    'status': status,
+                    'generated': generated,
+                    'population_size': population_size,
+                    'elapsed': time.perf_counter() - start,
+                })
+
+        def generate(persona):
+            population = persona.create_population(force=True, on_progress=report, should_stop=should_stop)
+            if population is None:
+                return None
+            report(persona, len(population), persona.persona_spec.get('population_size', default_population_size),
+                   'completed')
+            return population
+
+        populations = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='population') as executor:
+            generate = metrics.bind(generate)
+            futures = {executor.submit(generate, persona): persona for persona in personas}
+            for future in as_completed(futures):
+                persona = futures[future]
+                population = future.result()
+                if population is None:
+                    continue
+                populations[persona.persona_spec['persona_id']] = population
+                # Snapshots of the previous population no longer apply
+                self.population_snapshots.pop(persona.persona_spec['persona_id'], None)
+                self.primed.pop(persona.persona_spec['persona_id'], None)
+        return populations
+
+    def run(self, on_result=None, should_stop=None, on_progress=None, max_workers=default_max_workers):
+        """Run every persona in turn, passing each result to on_result as it finishes."""
+        self.create_populations(max_workers=max_workers, on_progress=on_progress, should_stop=should_stop)
+        results = []
+        for persona in self.personas.values():
+            if should_stop and should_stop():
+                break
+            result = self.run_persona(persona, should_stop)
+            if result is None:
+                break
+            results.append(result)
+            if on_result:
+                on_result(result)
+        return results
+
+    def deck_pulse(self, ppt:PPT, name=None):
+        """A pulse for another deck, reviewed by this pulse's personas and populations."""
+        pulse = Pulse(name=name or (ppt.ppt_details or {}).get('title') or self.name, ppt=ppt,
+                      analysis_mode=self.analysis_mode, token_budget=self.token_budget)
+        pulse.personas = self.personas
+        pulse.population_snapshots = self.population_snapshots
+        return pulse
+
+    def run_decks(self, ppts, on_result=None, should_stop=None, on_progress=None, max_workers=default_max_workers):
+        """Review several decks with the same personas and compare the results side by side.
+
+        Populations are generated (or loaded) once, so personas should be added
+        with describe_deck=False. Every (deck, persona) review is then scheduled
+        on one pool, and their chunk reviews, merges and extraction batches all
+        share one worker pool of max_workers threads. on_result gets each persona
+        result, tagged with its deck index, as it finishes. Returns the
+        structure built by side_by_side.
+        """
+        self.create_populations(max_workers=max_workers, on_progress=on_progress, should_stop=should_stop)
+        if should_stop and should_stop():
+            return self.side_by_side([self.deck_pulse(ppt) for ppt in ppts], [], [])
+        # Snapshot populations up front so concurrent reviews only ever read them
+        for persona in self.personas.values():
+            self.population_snapshot(persona)
+        deck_pulses = [self.deck_pulse(ppt) for ppt in ppts]
+
+        def review(deck, persona):
+            if should_stop and should_stop():
+                return None
+            with metrics.labels(deck=deck):
+                result = deck_pulses[deck].run_persona(persona, should_stop, workers)
+            if result is not None and on_result:
+                on_result({**result, 'deck': deck})
+            return result
+
+        tasks = [(deck, persona) for deck in range(len(deck_pulses)) for persona in self.personas.values()]
+        # Review tasks mostly wait on the workers, which make the LLM calls; keeping them
+        # apart means a task never waits for work queued behind itself
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pulse-worker') as workers, \
+                ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='deck') as executor:
+            review = metrics.bind(review)
+            futures = [executor.submit(review, deck, persona) for deck, persona in tasks]
+            results = [future.result() for future in futures]
+        return self.side_by_side(deck_pulses, tasks, results)
+
+    @staticmethod
+    def side_by_side(deck_pulses, tasks, results):
+        """Group (deck, persona) results by persona, with one entry per deck in deck order."""
+        personas = {}
+        for (deck, persona), result in zip(tasks, results):
+            spec = persona.get_specification()
+            entry = personas.setdefault(spec['persona_id'], {
+                'id': spec['persona_id'],
+                'name': spec['persona_type'],
+                'description': spec['persona_description'],
+                'agents': [agent.minibio() for agent in persona.population],
+                'decks': [None] * len(deck_pulses),
+            })
+            if result is not None:
+                entry['decks'][deck] = {key: value for key, value in result.items()
+                                        if key not in ('id', 'name', 'description', 'population_size', 'agents')}
+        return {
+            'decks': [{'index': deck, 'pulse_id': pulse.pulse_id, 'name': pulse.name, 'slides': len(pulse.ppt.slides)}
+                      for deck, pulse in enumerate(deck_pulses)],
+            'personas': list(personas.values()),
+        }
@@ -0,0 +1,88 @@
+import threading
+import time
+
+default_requests_per_minute = 500
+default_tokens_per_minute = 200000
+default_initial_backoff = 1.0
+default_max_backoff = 60.0
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute, holding at most capacity units."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+class RateLimiter:
+    """Process-wide request and token budgets with adaptive backoff on 429 responses.
+
+    Every caller blocks in acquire() until both buckets can cover the request.
+    A 429 pauses all callers; the pause doubles on consecutive 429s (or follows
+    the server's Retry-After) and shrinks again as calls succeed.
+    """
+
+    def __init__(self, requests_per_minute=default_requests_per_minute,
+                 tokens_per_minute=default_tokens_per_minute,
+                 initial_backoff=default_initial_backoff, max_backoff=default_max_backoff):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.backoff = 0.0
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.paused_until - now,
+                           self.requests.wait_time(1, now),
+                           self.tokens.wait_time(tokens, now))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                self.waited += wait
+            time.sleep(wait)
+
+    def on_rate_limited(self, retry_after=None):
+        with self._lock:
+            self.rate_limited += 1
+            self.backoff = min(self.max_backoff, self.backoff * 2 if self.backoff else self.initial_backoff)
+            pause = max(self.backoff, retry_after or 0.0)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            return pause
+
+    def on_success(self):
+        with self._lock:
+            if self.backoff:
+                self.backoff = self.backoff / 2 if self.backoff / 2 >= self.initial_backoff else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_limited': self.rate_limited,
+                'backoff': self.backoff,
+                'waited': self.waited,
+            }
@@ -0,0 +1,97 @@
+import copy
+import itertools
+import threading
+from uuid import uuid4
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+
+class PopulationSnapshot:
+    """Complete state of a population after it has taken in the deck, frozen for forking.
+
+    Agent states are their full TinyPerson specs (memory and mental state
+    included) and are never modified. Each fork loads its own copy of an agent
+    the first time it uses it, so independent rounds run from the same primed
+    state without re-ingesting the deck or seeing each other's memory, and
+    agents a round does not involve are never copied.
+    """
+
+    def __init__(self, agents, world=None, names=None):
+        # names: the population's names, when agents are renamed fork copies
+        self.names = list(names or [agent.name for agent in agents])
+        # Typed the way load_specification restores them, so memories come back as memory objects
+        self.states = {name: agent.to_json(serialization_type_field_name="type")
+                       for name, agent in zip(self.names, agents)}
+        self.world_name = world.name if world else 'population'
+        self.current_datetime = world.current_datetime if world else None
+        self._fork_numbers = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def prime(cls, fork, stimuli):
+        """Broadcast stimuli (e.g. the deck) to a fork's agents and snapshot them."""
+        world = fork.world()
+        for stimulus in stimuli:
+            world.broadcast(stimulus)
+        return cls(fork.agents(), world, fork.snapshot.names)
+
+    def fork(self, label=None):
+        with self._lock:
+            number = next(self._fork_numbers)
+        return PopulationFork(self, f"{self.world_name} fork {number}{f' {label}' if label else ''}")
+
+class PopulationFork:
+    """A private, lazily loaded copy of a snapshot's agents and world.
+
+    TinyTroupe registers every agent and world by name, so copies get a
+    fork-specific name and close() (or leaving a with block) unregisters
+    them once the round is over; the returned agents stay usable.
+    """
+
+    def __init__(self, snapshot:PopulationSnapshot, name):
+        self.snapshot = snapshot
+        self.name = name
+        self.tag = uuid4().hex[:8]
+        self._agents = {}
+        self._world = None
+
+    def agent(self, name):
+        agent = self._agents.get(name)
+        if agent is None:
+            agent = TinyPerson.load_specification(copy.deepcopy(self.snapshot.states[name]),
+                                                  new_agent_name=f"{name} [{self.tag}]")
+            self._agents[name] = agent
+        return agent
+
+    def agents(self, names=None):
+        return [self.agent(name) for name in (names or self.snapshot.names)]
+
+    def world(self, names=None):
+        """The fork's world, holding the named agents (all of them by default)."""
+        if self._world is None:
+            self._world = TinyWorld(self.name, self.agents(names), broadcast_if_no_target=False)
+            if self.snapshot.current_datetime is not None:
+                self._world.current_datetime = self.snapshot.current_datetime
+        return self._world
+
+    def run(self, *stimuli, names=None, steps=1):
+        """Broadcast stimuli to the fork's agents, run the world and return the agents."""
+        world = self.world(names)
+        for stimulus in stimuli:
+            world.broadcast(stimulus)
+        world.run(steps)
+        return world.agents
+
+    def close(self):
+        """Unregister the fork's world and agents so they can be garbage collected."""
+        if self._world is not None:
+            TinyWorld.all_environments.pop(self._world.name, None)
+            self._world = None
+        for agent in self._agents.values():
+            TinyPerson.all_agents.pop(agent.name, None)
+        self._agents = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,272 @@
+"""Benchmark suite.
+
+Usage:
+    python -m benchmarks.bench run --output results.json
+    python -m benchmarks.bench run --only extract_large --repeats 10
+    python -m benchmarks.bench compare baseline.json results.json --threshold 0.15
+
+Each benchmark runs in a fresh process so its peak RSS is its own. LLM-backed
+benchmarks use the deterministic FakeLLMClient with simulated latency, so no
+API calls are made. compare exits non-zero when latency, peak RSS or LLM call
+count regressed past the threshold, or when a benchmark measured in the
+baseline is missing, skipped or failed in the current results.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_deck import generate_deck
+
+default_repeats = 5
+default_threshold = 0.15
+default_fake_latency = 0.05
+
+# Synthetic deck shapes used by the benchmarks
+DECKS = {
+    'small': dict(slides=10, words_per_slide=60, media=2, media_size=64),
+    'large': dict(slides=300, words_per_slide=120, media=20, media_size=256, images_per_slide=2),
+}
+
+def timed(fn, repeats):
+    latencies = []
+    result = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        result = fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies, result
+
+def deck_bytes(deck, seed=0):
+    buffer = io.BytesIO()
+    generate_deck(buffer, seed=seed, **DECKS[deck])
+    return buffer.getvalue()
+
+def bench_extract(repeats, deck):
+    from pptx_extractor import PPTXExtractor
+    data = deck_bytes(deck)
+
+    def run(_):
+        extractor = PPTXExtractor(io.BytesIO(data))
+        extractor.extract_content()
+        return len(extractor.text_content)
+
+    latencies, slides = timed(run, repeats)
+    return {'latencies': latencies, 'slides': slides, 'deck_bytes': len(data)}
+
+def bench_media(repeats, deck):
+    from pptx_extractor import PPTXExtractor
+    from slide_media import MediaCache, process_media
+    data = deck_bytes(deck)
+    slides = list(PPTXExtractor(io.BytesIO(data)).iter_slides())
+
+    def run(_):
+        # A fresh cache each time, so every unique image is hashed and downsampled
+        cache = MediaCache(tempfile.mkdtemp(prefix='bench_media_'))
+        return process_media(io.BytesIO(data), slides, cache)
+
+    latencies, manifest = timed(run, repeats)
+    return {'latencies': latencies, 'images': len(manifest['images']), 'deck_bytes': len(data)}
+
+def bench_upload_route(repeats, deck, cached=False):
+    os.environ['PULSE_FAKE_LLM'] = '1'
+    os.environ['LLM_CACHE_PATH'] = ''
+    os.chdir(tempfile.mkdtemp(prefix='bench_upload_'))
+    from app import app
+    client = app.test_client()
+    decks = [deck_bytes(deck, seed=0 if cached else i) for i in range(repeats)]
+    if cached:
+        client.post('/', data={'file': (io.BytesIO(decks[0]), 'deck.pptx')}, content_type='multipart/form-data')
+
+    def run(i):
+        response = client.post('/', data={'file': (io.BytesIO(decks[i]), 'deck.pptx')},
+                               content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"Upload failed with status {response.status_code}")
+        # Errors are flashed on a 200 page too, so only a rendered upload ID counts as success
+        if not re.search(rb'name="upload_id" value="[0-9a-f]{32}"', response.data):
+            raise RuntimeError("Upload failed: no upload_id in the response")
+
+    latencies, _ = timed(run, repeats)
+    return {'latencies': latencies, 'deck_bytes': len(decks[0])}
+
+def bench_slide_prompt(repeats, deck):
+    from pptx_extractor import PPTXExtractor, slides_to_json
+    from backend.utils.ppt import PPT
+    ppt_json = slides_to_json(PPTXExtractor(io.BytesIO(deck_bytes(deck))).iter_slides())
+    ppt = PPT({'title': 'Benchmark deck'}, ppt_json)
+    latencies, prompt = timed(lambda _: ppt.slide_content_prompt(), repeats)
+    return {'latencies': latencies, 'prompt_chars': len(prompt)}
+
+def bench_pulse(repeats, deck, personas=2, population_size=2, latency=default_fake_latency):
+    from pptx_extractor import PPTXExtractor, slides_to_json
+    from backend.utils.llm import use_fake_llm
+    from backend.utils.ppt import PPT
+    from backend.utils.pulse import Pulse
+
+    client = use_fake_llm(latency)
+    ppt_json = slides_to_json(PPTXExtractor(io.BytesIO(deck_bytes(deck))).iter_slides())
+
+    def run(i):
+        pulse = Pulse(name=f'Benchmark {i}', ppt=PPT({'title': 'Benchmark deck'}, ppt_json))
+        for p in range(personas):
+            pulse.create_persona(f'Persona {i}-{p}', 'Professionals reviewing a pitch.', population_size)
+        return pulse.run()
+
+    calls_before = client.calls
+    latencies, _ = timed(run, repeats)
+    return {'latencies': latencies, 'llm_calls': (client.calls - calls_before) / repeats}
+
+BENCHMARKS = {
+    'extract_small': (bench_extract, {'deck': 'small'}),
+    'extract_large': (bench_extract, {'deck': 'large'}),
+    'media_large': (bench_media, {'deck': 'large'}),
+    'upload_route': (bench_upload_route, {'deck': 'small'}),
+    'upload_route_cached': (bench_upload_route, {'deck': 'small', 'cached': True}),
+    'slide_prompt_large': (bench_slide_prompt, {'deck': 'large'}),
+    'pulse_e2e': (bench_pulse, {'deck': 'small'}),
+}
+
+def _worker(name, repeats, queue):
+    fn, kwargs = BENCHMARKS[name]
+    try:
+        result = fn(repeats, **kwargs)
+    except ImportError as e:
+        queue.put({'skipped': f"missing dependency: {e}"})
+        return
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+        return
+    latencies = result.pop('latencies')
+    result.update({
+        'repeats': repeats,
+        'latency_median': statistics.median(latencies),
+        'latency_min': min(latencies),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+    queue.put(result)
+
+def run_benchmark(name, repeats):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_worker, args=(name, repeats, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def run(names, repeats):
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'benchmarks': {},
+    }
+    for name in names:
+        result = run_benchmark(name, repeats)
+        results['benchmarks'][name] = result
+        if 'latency_median' in result:
+            extra = f", {result['llm_calls']:.0f} LLM calls" if 'llm_calls' in result else ''
+            print(f"{name}: {result['latency_median'] * 1000:.1f} ms median, "
+                  f"{result['peak_rss_kb'] / 1024:.1f} MB peak RSS{extra}", file=sys.stderr)
+        else:
+            print(f"{name}: {result.get('skipped') or result.get('error')}", file=sys.stderr)
+    return results
+
+COMPARED_METRICS = ('latency_median', 'peak_rss_kb', 'llm_calls')
+
+def compare(baseline, current, threshold=default_threshold):
+    """List (benchmark, metric, baseline value, current value, relative change) regressions.
+
+    A benchmark or metric the baseline measured but the current results lack
+    is a regression too, with the reason as current value and no change.
+    """
+    regressions = []
+    for name, base in baseline.get('benchmarks', {}).items():
+        if 'latency_median' not in base:
+            continue  # never measured, nothing to regress from
+        new = current.get('benchmarks', {}).get(name)
+        if not new:
+            regressions.append((name, 'missing', None, 'not in current results', None))
+            continue
+        if 'error' in new or 'skipped' in new:
+            regressions.append((name, 'error' if 'error' in new else 'skipped', None,
+                                new.get('error') or new.get('skipped'), None))
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in base:
+                continue
+            if metric not in new:
+                regressions.append((name, metric, base[metric], 'not measured', None))
+                continue
+            # LLM calls are deterministic, any increase is a regression
+            limit = 0 if metric == 'llm_calls' else threshold
+            change = (new[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+            if change > limit:
+                regressions.append((name, metric, base[metric], new[metric], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run or compare benchmarks.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    run_parser.add_argument('--repeats', type=int, default=default_repeats)
+    run_parser.add_argument('--output', help="Write results JSON here (default: stdout)")
+
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=default_threshold,
+                                help="Allowed relative increase in latency and peak RSS")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.only or list(BENCHMARKS), args.repeats)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for name, metric, base, new, change in regressions:
+        if change is None:
+            print(f"REGRESSION {name} {metric}: {new}")
+        else:
+            print(f"REGRESSION {name} {metric}: {base:.4g} -> {new:.4g} ({change:+.1%})")
+    if not regressions:
+        print("No regressions")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
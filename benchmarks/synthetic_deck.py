@@ -0,0 +1,132 @@
+"""Synthetic .pptx generator for benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic_deck out.pptx --slides 300 --words 120 --media 20 --media-size 256
+"""
+import argparse
+import random
+import struct
+import zipfile
+import zlib
+
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_SLIDE = f"{NS_R}/slide"
+REL_NOTES = f"{NS_R}/notesSlide"
+REL_IMAGE = f"{NS_R}/image"
+REL_DOCUMENT = f"{NS_R}/officeDocument"
+
+WORDS = ("presentation strategy customer growth market product platform revenue user insight "
+         "design launch team roadmap metric engagement pilot feedback quarter value").split()
+
+def png_bytes(width, height, seed=0):
+    """A noisy RGB PNG; noise keeps it from compressing to nothing."""
+    rng = random.Random(seed)
+    rows = b''.join(b'\x00' + bytes(rng.getrandbits(8) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+def text_shape(shape_id, text, placeholder=None):
+    ph = f'<p:nvPr><p:ph type="{placeholder}"/></p:nvPr>' if placeholder else '<p:nvPr/>'
+    paragraphs = ''.join(f'<a:p><a:r><a:t>{line}</a:t></a:r></a:p>' for line in text.split('\n'))
+    return (f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="Shape {shape_id}"/><p:cNvSpPr/>{ph}</p:nvSpPr>'
+            f'<p:spPr/><p:txBody><a:bodyPr/>{paragraphs}</p:txBody></p:sp>')
+
+def picture_shape(shape_id, rel_id):
+    return (f'<p:pic><p:nvPicPr><p:cNvPr id="{shape_id}" name="Picture {shape_id}"/><p:cNvPicPr/><p:nvPr/></p:nvPicPr>'
+            f'<p:blipFill><a:blip r:embed="{rel_id}"/></p:blipFill><p:spPr/></p:pic>')
+
+def relationships(rels):
+    items = ''.join(f'<Relationship Id="{rid}" Type="{kind}" Target="{target}"/>' for rid, kind, target in rels)
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{NS_REL}">{items}</Relationships>'
+
+def generate_deck(path, slides=10, words_per_slide=60, notes=True, words_per_note=80,
+                  media=0, media_size=128, images_per_slide=1, seed=0):
+    """Write a synthetic deck to path (a filename or binary file object).
+
+    media unique images of media_size x media_size pixels are shared by the
+    slides, images_per_slide each, so the same image appears on many slides.
+    """
+    rng = random.Random(seed)
+    overrides = []
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i in range(1, media + 1):
+            z.writestr(f'ppt/media/image{i}.png', png_bytes(media_size, media_size, seed + i))
+
+        presentation_rels = []
+        slide_ids = []
+        for n in range(1, slides + 1):
+            rels = []
+            shapes = [text_shape(2, f"Slide {n}: {words(rng, 5)}", 'title'),
+                      text_shape(3, '\n'.join(words(rng, 10) for _ in range(max(1, words_per_slide // 10))), 'body')]
+            if media:
+                for k in range(images_per_slide):
+                    rel_id = f'rId{len(rels) + 1}'
+                    image = (n * images_per_slide + k) % media + 1
+                    rels.append((rel_id, REL_IMAGE, f'../media/image{image}.png'))
+                    shapes.append(picture_shape(10 + k, rel_id))
+            if notes:
+                rel_id = f'rId{len(rels) + 1}'
+                rels.append((rel_id, REL_NOTES, f'../notesSlides/notesSlide{n}.xml'))
+                z.writestr(f'ppt/notesSlides/notesSlide{n}.xml',
+                           f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                           f'<p:notes xmlns:a="{NS_A}" xmlns:r="{NS_R}" xmlns:p="{NS_P}"><p:cSld><p:spTree>'
+                           f'{text_shape(2, words(rng, words_per_note), "body")}</p:spTree></p:cSld></p:notes>')
+                overrides.append((f'/ppt/notesSlides/notesSlide{n}.xml',
+                                  'application/vnd.openxmlformats-officedocument.presentationml.notesSlide+xml'))
+
+            z.writestr(f'ppt/slides/slide{n}.xml',
+                       f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                       f'<p:sld xmlns:a="{NS_A}" xmlns:r="{NS_R}" xmlns:p="{NS_P}"><p:cSld><p:spTree>'
+                       f'{"".join(shapes)}</p:spTree></p:cSld></p:sld>')
+            z.writestr(f'ppt/slides/_rels/slide{n}.xml.rels', relationships(rels))
+            overrides.append((f'/ppt/slides/slide{n}.xml',
+                              'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'))
+            presentation_rels.append((f'rId{n}', REL_SLIDE, f'slides/slide{n}.xml'))
+            slide_ids.append(f'<p:sldId id="{255 + n}" r:id="rId{n}"/>')
+
+        z.writestr('ppt/presentation.xml',
+                   f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   f'<p:presentation xmlns:a="{NS_A}" xmlns:r="{NS_R}" xmlns:p="{NS_P}">'
+                   f'<p:sldIdLst>{"".join(slide_ids)}</p:sldIdLst></p:presentation>')
+        z.writestr('ppt/_rels/presentation.xml.rels', relationships(presentation_rels))
+        z.writestr('_rels/.rels', relationships([('rId1', REL_DOCUMENT, 'ppt/presentation.xml')]))
+        override_xml = ''.join(f'<Override PartName="{part}" ContentType="{kind}"/>' for part, kind in overrides)
+        z.writestr('[Content_Types].xml',
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Default Extension="png" ContentType="image/png"/>'
+                   '<Override PartName="/ppt/presentation.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"/>'
+                   f'{override_xml}</Types>')
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic .pptx deck.")
+    parser.add_argument('output')
+    parser.add_argument('--slides', type=int, default=10)
+    parser.add_argument('--words', type=int, default=60, help="Words of body text per slide")
+    parser.add_argument('--note-words', type=int, default=80, help="Words of speaker notes per slide (0 for none)")
+    parser.add_argument('--media', type=int, default=0, help="Number of unique images")
+    parser.add_argument('--media-size', type=int, default=128, help="Image width/height in pixels")
+    parser.add_argument('--images-per-slide', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_deck(args.output, args.slides, args.words, args.note_words > 0, args.note_words,
+                  args.media, args.media_size, args.images_per_slide, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# Bump when the structure of cached extraction records changes
+EXTRACTION_CACHE_VERSION = 3
+
+default_max_bytes = 256 * 1024 * 1024
+
+
+def sha256_file(file, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file path or a seekable binary file object."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    else:
+        position = file.tell()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+        file.seek(position)
+    return digest.hexdigest()
+
+
+class DiskLRUCache:
+    """Byte-budgeted cache of files in a directory, evicted least recently used first.
+
+    Recency is tracked through file mtimes, so the cache survives restarts and
+    can be shared by several processes pointing at the same directory.
+    """
+
+    def __init__(self, cache_folder, max_bytes=default_max_bytes, suffix='.bin'):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(cache_folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.cache_folder, f"{key}{self.suffix}")
+
+    def _entries(self):
+        """(path, size, mtime) of every cached entry on disk."""
+        entries = []
+        with os.scandir(self.cache_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get_bytes(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def touch(self, key):
+        """Mark an entry as recently used without reading it; returns whether it exists."""
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put_bytes(self, key, data):
+        if len(data) > self.max_bytes:
+            return False
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.total_bytes += len(data) - previous
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _evict(self):
+        # Rescan so entries written by other processes are accounted for
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self.total_bytes = total
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class ExtractionCache(DiskLRUCache):
+    """Extracted slide/notes records and media manifest, keyed by the SHA-256 of the deck."""
+
+    def __init__(self, cache_folder, max_bytes=default_max_bytes):
+        super().__init__(cache_folder, max_bytes, suffix='.json')
+
+    @staticmethod
+    def key(digest):
+        return f"v{EXTRACTION_CACHE_VERSION}_{digest}"
+
+    def get(self, digest):
+        data = self.get_bytes(self.key(digest))
+        if data is None:
+            return None
+        return json.loads(data.decode('utf-8'))
+
+    def put(self, digest, record):
+        return self.put_bytes(self.key(digest), json.dumps(record, ensure_ascii=False).encode('utf-8'))
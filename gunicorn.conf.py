@@ -0,0 +1,16 @@
+"""Gunicorn settings for the Flask app.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Job event streams (/jobs/<id>/events) hold their connection open, so workers
+must be threaded: with the default sync worker each open stream would pin a
+whole process, so the app refuses streams there and clients poll instead.
+Several processes are fine, because job status and events are shared through
+JOB_STORE_PATH and uploads through SLIDE_STORE=disk.
+"""
+import os
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+raw_env = [f"SLIDE_STORE={os.environ.get('SLIDE_STORE', 'disk')}"]
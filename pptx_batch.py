@@ -0,0 +1,177 @@
+"""Batch extraction of PowerPoint decks.
+
+Usage:
+    python pptx_batch.py decks/ --workers 8 --out-dir extracted/
+    python pptx_batch.py "archive/**/*.pptx" --jsonl slides.jsonl
+
+Decks are extracted across a process pool. Decks with more than
+--split-threshold slides are split into chunks of --chunk-size slides so a
+single large deck is parsed by several workers at once. With --out-dir,
+output files mirror the decks' folders, so same-named decks don't collide.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pptx_extractor import PPTXExtractor, extract_slides, slides_to_json
+
+default_split_threshold = 100
+default_chunk_size = 50
+
+
+def find_decks(inputs):
+    """Expand directories and glob patterns into a sorted list of .pptx files."""
+    decks = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*.pptx')
+        else:
+            pattern = item
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith('.pptx'):
+                decks.add(path)
+    return sorted(decks)
+
+
+def extract_or_plan(deck, split_threshold=default_split_threshold):
+    """Worker task: extract a small deck, or return its resolved members to split.
+
+    Returns ('slides', slides) or ('members', slide_members() output).
+    """
+    extractor = PPTXExtractor(deck)
+    members = extractor.slide_members()
+    if len(members) > split_threshold:
+        return 'members', members
+    return 'slides', list(extractor.iter_slides(members=members))
+
+
+def output_paths(out_dir, decks):
+    """Map decks to output files, mirroring their folders below the decks' common folder."""
+    if not decks:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(deck)) for deck in decks])
+    paths = {}
+    for deck in decks:
+        name = os.path.splitext(os.path.relpath(os.path.abspath(deck), root))[0]
+        paths[deck] = os.path.join(out_dir, f"{name}_slides_content.json")
+    return paths
+
+
+def run_batch(decks, workers=None, out_dir=None, jsonl=None,
+              split_threshold=default_split_threshold, chunk_size=default_chunk_size):
+    """Extract decks and write one JSON per deck (out_dir) and/or a JSONL stream.
+
+    Each deck is opened once in a worker, which extracts it directly unless it
+    has more than split_threshold slides. Large decks come back as resolved
+    members and are split into chunk_size tasks, so their .rels are parsed once.
+    Returns a stats dict with deck/slide counts, elapsed time and throughput.
+    """
+    start = time.perf_counter()
+    errors = {}
+    paths = output_paths(out_dir, decks) if out_dir else {}
+    pending = {}
+    parts = {}
+
+    jsonl_file = open(jsonl, 'w', encoding='utf-8') if jsonl else None
+
+    slide_count = 0
+    deck_count = 0
+
+    def finish(deck, slides):
+        nonlocal slide_count, deck_count
+        slides = sorted(slides, key=lambda s: s.index)
+        slides_data = slides_to_json(slides)
+        if out_dir:
+            os.makedirs(os.path.dirname(paths[deck]), exist_ok=True)
+            with open(paths[deck], 'w', encoding='utf-8') as f:
+                json.dump(slides_data, f, indent=2, ensure_ascii=False)
+        if jsonl_file:
+            jsonl_file.write(json.dumps({'deck': deck, 'slides': slides_data}, ensure_ascii=False) + '\n')
+        deck_count += 1
+        slide_count += len(slides)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(extract_or_plan, deck, split_threshold): (deck, None) for deck in decks}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    deck, chunk = futures.pop(future)
+                    if deck in errors:
+                        continue
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors[deck] = str(e)
+                        parts.pop(deck, None)
+                        continue
+
+                    if chunk is None:
+                        kind, value = result
+                        if kind == 'slides':
+                            finish(deck, value)
+                            continue
+                        # Too large for one worker: split its members into chunk tasks
+                        chunks = [value[i:i + chunk_size] for i in range(0, len(value), chunk_size)]
+                        pending[deck] = len(chunks)
+                        parts[deck] = []
+                        for members in chunks:
+                            futures[executor.submit(extract_slides, deck, None, members)] = (deck, True)
+                        continue
+
+                    parts[deck].extend(result)
+                    pending[deck] -= 1
+                    if not pending[deck]:
+                        finish(deck, parts.pop(deck))
+    finally:
+        if jsonl_file:
+            jsonl_file.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'decks': deck_count,
+        'slides': slide_count,
+        'errors': errors,
+        'elapsed': elapsed,
+        'decks_per_second': deck_count / elapsed if elapsed else 0.0,
+        'slides_per_second': slide_count / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract slide text and notes from many .pptx decks.")
+    parser.add_argument('inputs', nargs='+', help="Directories or glob patterns of .pptx files")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--out-dir', help="Write one slides_content-style JSON per deck here")
+    parser.add_argument('--jsonl', help="Write all decks as a single JSONL stream to this file")
+    parser.add_argument('--split-threshold', type=int, default=default_split_threshold,
+                        help="Split decks with more slides than this across workers")
+    parser.add_argument('--chunk-size', type=int, default=default_chunk_size,
+                        help="Slides per task when a deck is split")
+    args = parser.parse_args(argv)
+
+    if not args.out_dir and not args.jsonl:
+        parser.error("one of --out-dir or --jsonl is required")
+
+    decks = find_decks(args.inputs)
+    if not decks:
+        print("No .pptx files found", file=sys.stderr)
+        return 1
+
+    stats = run_batch(decks, args.workers, args.out_dir, args.jsonl,
+                      args.split_threshold, args.chunk_size)
+
+    for deck, error in stats['errors'].items():
+        print(f"Error processing {deck}: {error}", file=sys.stderr)
+    print(f"Extracted {stats['decks']} decks, {stats['slides']} slides in {stats['elapsed']:.2f}s "
+          f"({stats['decks_per_second']:.2f} decks/s, {stats['slides_per_second']:.2f} slides/s)",
+          file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
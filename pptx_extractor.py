@@ -1,73 +1,271 @@
-import os
+import io
+import posixpath
 import zipfile
 import xml.etree.ElementTree as ET
 import re
-import shutil
+from backend.utils.metrics import metrics
+
+SLIDE_PATTERN = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+MEDIA_PREFIX = 'ppt/media/'
+PRESENTATION_MEMBER = 'ppt/presentation.xml'
+
+NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+REL_NOTES = 'notesSlide'
+MEDIA_RELS = ('image', 'media', 'video', 'audio')
+
+# Placeholder types holding the slide title, and slide furniture whose text
+# (footers, dates, slide numbers) is left out of the body and notes
+TITLE_PLACEHOLDERS = ('title', 'ctrTitle')
+FURNITURE_PLACEHOLDERS = ('dt', 'ftr', 'hdr', 'sldNum')
+
+class Slide:
+    """One slide in presentation order: 1-based index, title, body, notes and media names."""
+
+    __slots__ = ('index', 'title', 'body', 'notes', 'media')
+
+    def __init__(self, index, title='', body='', notes='', media=()):
+        self.index = index
+        self.title = title
+        self.body = body
+        self.notes = notes
+        self.media = list(media)
+
+    @property
+    def text(self):
+        """Title and body together, as shown on the slide."""
+        return '\n'.join(part for part in (self.title, self.body) if part)
+
+    def has_content(self):
+        return bool(self.title or self.body or self.notes)
+
+    def to_dict(self):
+        return {'index': self.index, 'title': self.title, 'body': self.body,
+                'notes': self.notes, 'media': self.media}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['index'], data.get('title', ''), data.get('body', ''),
+                   data.get('notes', ''), data.get('media', ()))
+
+    def __repr__(self):
+        return f"Slide({self.index}, title={self.title!r})"
+
+def _xml_stream(xml_content):
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf-8')
+    if isinstance(xml_content, bytes):
+        xml_content = io.BytesIO(xml_content)
+    return xml_content
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
 
 class PPTXExtractor:
     def __init__(self, pptx_path):
+        # pptx_path may be a filesystem path or a binary file-like object
         self.pptx_path = pptx_path
-        self.temp_dir = "temp_extraction"
-        os.makedirs(self.temp_dir, exist_ok=True)
-        
+
         # Initialize content storage
         self.text_content = []
         self.notes_content = []
         self.media_files = []
 
     def extract_text_from_xml(self, xml_content):
-        """Extract text from XML content."""
+        """Extract text from XML content (bytes, str or a binary stream)."""
+        xml_content = _xml_stream(xml_content)
         try:
-            root = ET.fromstring(xml_content)
-            # Find all text elements (a:t in PowerPoint XML)
+            # Find all text elements (a:t in PowerPoint XML), clearing every
+            # element once it is closed so parsed content is released as we go
             text_elements = []
-            for elem in root.iter():
+            for _, elem in ET.iterparse(xml_content, events=('end',)):
                 if elem.tag.endswith('}t'):  # Text element in any namespace
                     if elem.text and elem.text.strip():
                         text_elements.append(elem.text.strip())
+                elem.clear()
             return '\n'.join(text_elements)
         except ET.ParseError:
             return ""
 
-    def extract_content(self):
-        """Extract content from the PowerPoint file."""
+    def extract_shapes_from_xml(self, xml_content):
+        """List (placeholder type, text) per shape, in document order.
+
+        Text outside shapes (e.g. tables) gets a None placeholder type; shapes
+        that are not placeholders get 'obj', the OOXML default.
+        """
+        shapes = []
+        open_shapes = []
         try:
-            # Extract the PPTX file (which is a ZIP archive)
-            with zipfile.ZipFile(self.pptx_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-            
-            # Process slides
-            slides_dir = os.path.join(self.temp_dir, 'ppt', 'slides')
-            if os.path.exists(slides_dir):
-                for slide_file in sorted(os.listdir(slides_dir)):
-                    if slide_file.endswith('.xml'):
-                        slide_number = re.search(r'slide(\d+)', slide_file).group(1)
-                        
-                        # Extract slide content
-                        with open(os.path.join(slides_dir, slide_file), 'r', encoding='utf-8') as f:
-                            slide_content = f.read()
-                            text = self.extract_text_from_xml(slide_content)
-                            if text:
-                                self.text_content.append(f"Slide {slide_number}:\n{text}")
-                
-                # Extract notes
-                notes_dir = os.path.join(self.temp_dir, 'ppt', 'notesSlides')
-                if os.path.exists(notes_dir):
-                    for notes_file in sorted(os.listdir(notes_dir)):
-                        if notes_file.endswith('.xml'):
-                            slide_number = re.search(r'notesSlide(\d+)', notes_file).group(1)
-                            with open(os.path.join(notes_dir, notes_file), 'r', encoding='utf-8') as f:
-                                notes_content = f.read()
-                                text = self.extract_text_from_xml(notes_content)
-                                if text:
-                                    self.notes_content.append(f"Slide {slide_number} Notes:\n{text}")
-                
-                # Track media files
-                media_dir = os.path.join(self.temp_dir, 'ppt', 'media')
-                if os.path.exists(media_dir):
-                    for media_file in os.listdir(media_dir):
-                        self.media_files.append(media_file)
-        finally:
-            # Clean up temporary directory
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+            for event, elem in ET.iterparse(_xml_stream(xml_content), events=('start', 'end')):
+                tag = _local_name(elem.tag)
+                if event == 'start':
+                    if tag == 'sp':
+                        shape = ['obj', []]
+                        shapes.append(shape)
+                        open_shapes.append(shape)
+                    elif tag == 'ph' and open_shapes:
+                        open_shapes[-1][0] = elem.get('type', 'obj')
+                    continue
+                if tag == 't':
+                    if elem.text and elem.text.strip():
+                        if open_shapes:
+                            open_shapes[-1][1].append(elem.text.strip())
+                        else:
+                            shapes.append([None, [elem.text.strip()]])
+                elif tag == 'sp' and open_shapes:
+                    open_shapes.pop()
+                elem.clear()
+        except ET.ParseError:
+            pass
+        return [(placeholder, '\n'.join(lines)) for placeholder, lines in shapes if lines]
+
+    def extract_slide_text(self, xml_content):
+        """Split a slide's text into (title, body) by placeholder type."""
+        title = []
+        body = []
+        for placeholder, text in self.extract_shapes_from_xml(xml_content):
+            if placeholder in TITLE_PLACEHOLDERS:
+                title.append(text)
+            elif placeholder not in FURNITURE_PLACEHOLDERS:
+                body.append(text)
+        return '\n'.join(title), '\n'.join(body)
+
+    def extract_notes_text(self, xml_content):
+        """Speaker notes text, without the slide number and other furniture."""
+        return '\n'.join(text for placeholder, text in self.extract_shapes_from_xml(xml_content)
+                         if placeholder not in FURNITURE_PLACEHOLDERS)
+
+    @staticmethod
+    def _relationships(zip_ref, member, names):
+        """List (type, target member) for a part's relationships, internal targets only."""
+        folder, filename = posixpath.split(member)
+        rels_member = posixpath.join(folder, '_rels', f"{filename}.rels")
+        if rels_member not in names:
+            return []
+        relationships = []
+        with zip_ref.open(rels_member) as f:
+            for _, elem in ET.iterparse(f, events=('end',)):
+                if _local_name(elem.tag) == 'Relationship' and elem.get('TargetMode') != 'External':
+                    target = posixpath.normpath(posixpath.join(folder, elem.get('Target', '')))
+                    relationships.append((elem.get('Id'), elem.get('Type', '').rpartition('/')[2], target))
+        return relationships
+
+    def _presentation_order(self, zip_ref, names):
+        """Slide members in the order of presentation.xml's slide ID list.
+
+        Falls back to slide file numbers for archives without a usable presentation part.
+        """
+        if PRESENTATION_MEMBER in names:
+            targets = {rel_id: target for rel_id, _, target
+                       in self._relationships(zip_ref, PRESENTATION_MEMBER, names)}
+            members = []
+            with zip_ref.open(PRESENTATION_MEMBER) as f:
+                try:
+                    for _, elem in ET.iterparse(f, events=('end',)):
+                        if _local_name(elem.tag) == 'sldId':
+                            target = targets.get(elem.get(f"{{{NS_R}}}id"))
+                            if target in names:
+                                members.append(target)
+                        elem.clear()
+                except ET.ParseError:
+                    members = []
+            if members:
+                return members
+        numbered = []
+        for name in names:
+            match = SLIDE_PATTERN.match(name)
+            if match:
+                numbered.append((int(match.group(1)), name))
+        return [name for _, name in sorted(numbered)]
+
+    def slide_members(self):
+        """List (index, slide member, notes member or None, media names) in presentation order.
+
+        Notes and media are found through each slide's relationships.
+        """
+        with zipfile.ZipFile(self.pptx_path, 'r') as zip_ref:
+            names = set(zip_ref.namelist())
+            members = []
+            for index, member in enumerate(self._presentation_order(zip_ref, names), 1):
+                notes_member = None
+                media = {}
+                for _, rel_type, target in self._relationships(zip_ref, member, names):
+                    if rel_type == REL_NOTES and target in names:
+                        notes_member = target
+                    elif rel_type in MEDIA_RELS and target.startswith(MEDIA_PREFIX):
+                        media[target[len(MEDIA_PREFIX):]] = None
+                members.append((index, member, notes_member, list(media)))
+        return members
+
+    def iter_slides(self, slide_numbers=None, members=None):
+        """Yield a Slide per slide, in presentation order, as it is parsed.
+
+        Members are streamed from the archive, so nothing past the current slide
+        is held. If slide_numbers (slide indexes) is given, only those are parsed.
+        members takes slide_members() output resolved earlier, to skip resolving it again.
+        """
+        if members is None:
+            members = self.slide_members()
+        if slide_numbers is not None:
+            wanted = set(slide_numbers)
+            members = [m for m in members if m[0] in wanted]
+
+        with zipfile.ZipFile(self.pptx_path, 'r') as zip_ref:
+            for index, member, notes_member, media in members:
+                with zip_ref.open(member) as f:
+                    title, body = self.extract_slide_text(f)
+                notes = ""
+                if notes_member:
+                    with zip_ref.open(notes_member) as f:
+                        notes = self.extract_notes_text(f)
+                yield Slide(index, title, body, notes, media)
+
+    def list_media(self):
+        """List media file names from the ZIP central directory."""
+        with zipfile.ZipFile(self.pptx_path, 'r') as zip_ref:
+            return [info.filename[len(MEDIA_PREFIX):] for info in zip_ref.infolist()
+                    if info.filename.startswith(MEDIA_PREFIX) and not info.is_dir()]
+
+    def extract_content(self):
+        """Extract content from the PowerPoint file.
+
+        Only the slide and notes XML members are decompressed, straight from the
+        archive. Media is listed from the ZIP central directory without reading it.
+        """
+        with metrics.span('extract'):
+            self._collect_content()
+
+    def _collect_content(self):
+        for slide in self.iter_slides():
+            metrics.inc('pulse_slides_extracted_total')
+            if slide.text:
+                self.text_content.append(f"Slide {slide.index}:\n{slide.text}")
+            if slide.notes:
+                self.notes_content.append(f"Slide {slide.index} Notes:\n{slide.notes}")
+
+        # Track media files
+        self.media_files.extend(self.list_media())
+
+
+def extract_slides(pptx_path, slide_numbers=None, members=None):
+    """Parse the given slides of a deck; picklable entry point for worker processes."""
+    return list(PPTXExtractor(pptx_path).iter_slides(slide_numbers, members))
+
+
+def slides_to_json(slides):
+    """Serialize Slide records, skipping slides with no text or notes."""
+    return [slide.to_dict() for slide in slides if slide.has_content()]
+
+
+def slides_from_json(data):
+    """Slide records from slides_to_json output.
+
+    Also accepts Slide objects, and the older {"slideN": {"text", "notes"}}
+    mapping that pulse specs saved before slides were structured.
+    """
+    if not data:
+        return []
+    if isinstance(data, dict):
+        numbered = sorted((int(key[len('slide'):]), value) for key, value in data.items())
+        return [Slide(index, body=value.get('text', ''), notes=value.get('notes', ''))
+                for index, value in numbered]
+    return [slide if isinstance(slide, Slide) else Slide.from_dict(slide) for slide in data]
@@ -0,0 +1,184 @@
+import io
+import os
+import struct
+import zipfile
+
+from extraction_cache import DiskLRUCache, default_max_bytes, sha256_file
+from pptx_extractor import MEDIA_PREFIX
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only small originals that fit max_side are cached
+    Image = None
+
+# Bump when the way variants are produced changes
+MEDIA_CACHE_VERSION = 1
+
+default_max_side = 1024
+default_jpeg_quality = 80
+# Without Pillow, originals up to this size are cached as-is instead of downsampled
+default_max_original_bytes = 512 * 1024
+
+IMAGE_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.tif': 'image/tiff',
+    '.tiff': 'image/tiff',
+    '.webp': 'image/webp',
+}
+# Formats vision models accept as they are
+PASSTHROUGH_TYPES = ('image/png', 'image/jpeg', 'image/gif', 'image/webp')
+
+
+def media_type(name):
+    return IMAGE_TYPES.get(os.path.splitext(name)[1].lower())
+
+
+def sniff_content_type(data):
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'GIF8'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def image_size(data):
+    """(width, height) read from a PNG, GIF, JPEG or WebP header, or None if unknown."""
+    try:
+        if data.startswith(b'\x89PNG') and data[12:16] == b'IHDR':
+            return struct.unpack('>II', data[16:24])
+        if data.startswith(b'GIF8'):
+            return struct.unpack('<HH', data[6:10])
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', data[26:30])
+                return width & 0x3fff, height & 0x3fff
+            if chunk == b'VP8L':
+                bits = int.from_bytes(data[21:25], 'little')
+                return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+            if chunk == b'VP8X':
+                return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+            return None
+        if data.startswith(b'\xff\xd8'):
+            # Walk the JPEG segments up to the start-of-frame marker
+            position = 2
+            while position + 9 < len(data):
+                if data[position] != 0xff:
+                    return None
+                marker = data[position + 1]
+                if marker in (0xc0, 0xc1, 0xc2, 0xc3, 0xc5, 0xc6, 0xc7, 0xc9, 0xca, 0xcb, 0xcd, 0xce, 0xcf):
+                    height, width = struct.unpack('>HH', data[position + 5:position + 9])
+                    return width, height
+                position += 2 + struct.unpack('>H', data[position + 2:position + 4])[0]
+    except struct.error:
+        return None
+    return None
+
+
+def downsample(data, max_side=default_max_side, quality=default_jpeg_quality):
+    """Shrink an image to fit max_side x max_side; JPEG unless it has transparency."""
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets the JPEG decoder scale down while decoding instead of afterwards
+        image.draft('RGB', (max_side, max_side))
+        image.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image.save(out, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(out, 'JPEG', quality=quality, optimize=True)
+        return out.getvalue()
+
+
+class MediaCache(DiskLRUCache):
+    """Downsampled slide images keyed by the SHA-256 of the original image.
+
+    Keys are content hashes, so an image repeated across slides or decks is
+    processed and stored once.
+    """
+
+    def __init__(self, cache_folder, max_bytes=default_max_bytes, max_side=default_max_side):
+        super().__init__(cache_folder, max_bytes, suffix='.img')
+        self.max_side = max_side
+
+    def key(self, digest):
+        return f"v{MEDIA_CACHE_VERSION}_{digest}_{self.max_side}"
+
+    def get(self, digest):
+        return self.get_bytes(self.key(digest))
+
+    def put(self, digest, data):
+        return self.put_bytes(self.key(digest), data)
+
+    def has(self, digest):
+        return self.touch(self.key(digest))
+
+    def make_variant(self, data, name):
+        """Bytes to cache for an original image, or None if it can't be bounded."""
+        if Image is not None:
+            try:
+                return downsample(data, self.max_side)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                return None
+        if media_type(name) in PASSTHROUGH_TYPES and len(data) <= default_max_original_bytes:
+            # Small files can still be huge images (e.g. a flat-colour PNG); only pass bounded ones
+            size = image_size(data)
+            if size is not None and max(size) <= self.max_side:
+                return data
+        return None
+
+
+def process_media(pptx_path, slides, cache):
+    """Hash, dedupe and cache downsampled variants of the images used by slides.
+
+    Images are read straight from the archive and only decoded when their hash
+    is not cached yet. Returns a manifest:
+    {'media': {media name: digest}, 'images': {digest: {...}}}
+    where each image lists the slides showing it and whether a variant is cached.
+    """
+    slides_by_name = {}
+    for slide in slides:
+        for name in slide.media:
+            slides_by_name.setdefault(name, []).append(slide.index)
+
+    manifest = {'media': {}, 'images': {}}
+    with zipfile.ZipFile(pptx_path, 'r') as zip_ref:
+        for name, slide_indexes in slides_by_name.items():
+            member = f"{MEDIA_PREFIX}{name}"
+            try:
+                info = zip_ref.getinfo(member)
+            except KeyError:
+                continue
+            with zip_ref.open(info) as f:
+                digest = sha256_file(f)
+            manifest['media'][name] = digest
+
+            image = manifest['images'].get(digest)
+            if image is not None:
+                # Same bytes under another name
+                image['slides'] = sorted(set(image['slides'] + slide_indexes))
+                continue
+
+            image = manifest['images'][digest] = {
+                'name': name,
+                'bytes': info.file_size,
+                'content_type': media_type(name),
+                'slides': slide_indexes,
+                'variant': False,
+            }
+            if image['content_type'] is None:
+                continue
+            if cache.has(digest):
+                image['variant'] = True
+                continue
+            variant = cache.make_variant(zip_ref.read(info), name)
+            if variant is not None:
+                image['variant'] = cache.put(digest, variant)
+    return manifest
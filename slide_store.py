@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+default_max_uploads = 1000
+
+UPLOAD_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class SlideStore(ABC):
+    """Extracted slide JSON kept per upload ID."""
+
+    @abstractmethod
+    def save(self, upload_id, record):
+        pass
+
+    @abstractmethod
+    def get(self, upload_id):
+        pass
+
+    @abstractmethod
+    def delete(self, upload_id):
+        pass
+
+
+class MemorySlideStore(SlideStore):
+    """In-process store; keeps the most recent max_uploads uploads."""
+
+    def __init__(self, max_uploads=default_max_uploads):
+        self.max_uploads = max_uploads
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, upload_id, record):
+        with self._lock:
+            self._records[upload_id] = record
+            self._records.move_to_end(upload_id)
+            while len(self._records) > self.max_uploads:
+                self._records.popitem(last=False)
+
+    def get(self, upload_id):
+        with self._lock:
+            return self._records.get(upload_id)
+
+    def delete(self, upload_id):
+        with self._lock:
+            self._records.pop(upload_id, None)
+
+
+class DiskSlideStore(SlideStore):
+    """One JSON file per upload; shared by every worker process using the same folder.
+
+    Like the memory store it keeps the most recent max_uploads uploads, using
+    file mtimes (refreshed on get) to find the least recently used ones.
+    """
+
+    def __init__(self, store_folder, max_uploads=default_max_uploads):
+        self.store_folder = store_folder
+        self.max_uploads = max_uploads
+        os.makedirs(store_folder, exist_ok=True)
+
+    def _path(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        return os.path.join(self.store_folder, f"{upload_id}.json")
+
+    def save(self, upload_id, record):
+        path = self._path(upload_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_folder, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with os.scandir(self.store_folder) as it:
+            entries = [(entry.stat().st_mtime, entry.path) for entry in it
+                       if entry.is_file() and entry.name.endswith('.json')]
+        if len(entries) <= self.max_uploads:
+            return
+        for _, path in sorted(entries)[:len(entries) - self.max_uploads]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by another worker
+
+    def get(self, upload_id):
+        try:
+            path = self._path(upload_id)
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return record
+
+    def delete(self, upload_id):
+        try:
+            os.remove(self._path(upload_id))
+        except (FileNotFoundError, ValueError):
+            pass
+
+
+def create_slide_store(backend='memory', store_folder=None, max_uploads=default_max_uploads):
+    if backend == 'memory':
+        return MemorySlideStore(max_uploads)
+    if backend == 'disk':
+        if not store_folder:
+            raise ValueError("store_folder must be provided for the disk slide store.")
+        return DiskSlideStore(store_folder, max_uploads)
+    raise ValueError(f"Unknown slide store backend: {backend}")
@@ -2,6 +2,60 @@ function sleep(ms) {
     return new Promise(resolve => setTimeout(resolve, ms));
 }
 
+// Poll a job's status until it finishes; used when event streams are unavailable
+async function pollJob(job, result) {
+    while (true) {
+        const response = await fetch(job.status_url);
+        if (!response.ok) {
+            throw new Error('Lost connection to analysis job');
+        }
+        const status = await response.json();
+        if (status.results.length !== result.personas.length) {
+            result.personas = status.results;
+            updateResultsUI(result);
+        }
+        if (status.status === 'completed' || status.status === 'cancelled') {
+            return result;
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.error || 'Analysis failed');
+        }
+        await sleep(2000);
+    }
+}
+
+// Follow a submitted analysis job over server-sent events, showing each persona as it finishes
+function waitForJob(job, baseResult) {
+    return new Promise((resolve, reject) => {
+        const result = { ...baseResult, personas: [] };
+        const events = new EventSource(job.events_url);
+
+        events.addEventListener('result', event => {
+            result.personas.push(JSON.parse(event.data));
+            updateResultsUI(result);
+        });
+
+        events.addEventListener('status', event => {
+            const status = JSON.parse(event.data);
+            if (status.status === 'completed' || status.status === 'cancelled') {
+                events.close();
+                resolve(result);
+            } else if (status.status === 'failed') {
+                events.close();
+                reject(new Error(status.error || 'Analysis failed'));
+            }
+        });
+
+        events.onerror = () => {
+            // The browser reconnects on its own while the job is still running;
+            // if the stream is refused, fall back to polling
+            if (events.readyState === EventSource.CLOSED) {
+                pollJob(job, result).then(resolve, reject);
+            }
+        };
+    });
+}
+
 // Initialize run button handler
 function initRunButtonHandler() {
     document.getElementById('runButton')?.addEventListener('click', async () => {
@@ -11,6 +65,7 @@ function initRunButtonHandler() {
         const pptTitle = document.getElementById('presentationTitle').value;
         const pptDescription = document.getElementById('presentationDescription').value;
         const pptIntent = document.getElementById('presentationIntent').value;
+        const uploadId = document.getElementById('uploadId')?.value || '';
         
         // Collect persona data
         const personas = [];
@@ -91,6 +146,7 @@ function initRunButtonHandler() {
                         'Content-Type': 'application/json',
                     },
                     body: JSON.stringify({
+                        upload_id: uploadId,
                         ppt_name: pptName,
                         ppt_file: pptFile,
                         ppt_title: pptTitle,
@@ -104,7 +160,14 @@ function initRunButtonHandler() {
                     throw new Error('Failed to run analysis');
                 }
                 
-                result = await runResponse.json();
+                const job = await runResponse.json();
+                result = await waitForJob(job, {
+                    ppt_name: pptName,
+                    ppt_file: pptFile,
+                    ppt_title: pptTitle,
+                    ppt_description: pptDescription,
+                    ppt_intent: pptIntent
+                });
             }
             
             // Update the UI with the results
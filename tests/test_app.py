@@ -0,0 +1,64 @@
+import io
+import os
+import re
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('tinytroupe')
+
+from benchmarks.synthetic_deck import generate_deck
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    # app keeps its stores and caches relative to the working directory
+    folder = tmp_path_factory.mktemp('app')
+    cwd = os.getcwd()
+    os.chdir(folder)
+    os.environ.update({'PULSE_FAKE_LLM': '1', 'LLM_CACHE_PATH': '', 'JOB_STORE_PATH': ''})
+    try:
+        from app import app
+        yield app.test_client()
+    finally:
+        os.chdir(cwd)
+
+
+def deck(seed=0):
+    buffer = io.BytesIO()
+    generate_deck(buffer, slides=4, seed=seed)
+    return buffer.getvalue()
+
+
+def upload(client, data):
+    response = client.post('/', data={'file': (io.BytesIO(data), 'deck.pptx')}, content_type='multipart/form-data')
+    assert response.status_code == 200
+    match = re.search(r'name="upload_id" value="([0-9a-f]{32})"', response.get_data(as_text=True))
+    assert match, response.get_data(as_text=True)
+    return match.group(1)
+
+
+def test_repeat_upload_is_served_from_the_extraction_cache(client):
+    data = deck()
+    first = upload(client, data)
+    second = upload(client, data)
+    assert first != second
+    slides = [client.get(f'/slides/{upload_id}').get_json() for upload_id in (first, second)]
+    assert slides[0]['slides'] == slides[1]['slides']
+    assert len(slides[1]['slides']) == 4
+    assert client.get('/cache_stats').get_json()['extraction_cache']['hits'] >= 1
+
+
+@pytest.mark.parametrize('decks', ['deck', [1], [{'ppt_title': 'No upload'}], [{'upload_id': 7}]])
+def test_malformed_decks_are_rejected(client, decks):
+    response = client.post('/run_analysis', json={'decks': decks, 'personas': []})
+    assert response.status_code == 400
+    assert 'upload_id' in response.get_json()['message']
+
+
+@pytest.mark.parametrize('personas', ['Engineer', [{'name': 'Engineer'}], [{'name': 'Engineer', 'description': ''}]])
+def test_personas_without_a_description_are_rejected(client, personas):
+    upload_id = upload(client, deck(seed=1))
+    response = client.post('/run_analysis', json={'upload_id': upload_id, 'personas': personas})
+    assert response.status_code == 400
+    assert 'description' in response.get_json()['message']
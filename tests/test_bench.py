@@ -0,0 +1,39 @@
+import json
+
+from benchmarks.bench import compare, main
+
+
+def measured(latency=1.0, rss=1000, **extra):
+    return {'latency_median': latency, 'peak_rss_kb': rss, **extra}
+
+
+def test_compare_flags_slowdowns_past_threshold():
+    baseline = {'benchmarks': {'a': measured(1.0), 'b': measured(1.0, llm_calls=4)}}
+    current = {'benchmarks': {'a': measured(1.1), 'b': measured(1.0, llm_calls=5)}}
+    regressions = compare(baseline, current, threshold=0.15)
+    assert [(name, metric) for name, metric, *_ in regressions] == [('b', 'llm_calls')]
+
+
+def test_compare_flags_missing_and_failed_benchmarks():
+    baseline = {'benchmarks': {'gone': measured(), 'broken': measured(), 'skipped': measured(),
+                               'never_ran': {'error': 'boom'}}}
+    current = {'benchmarks': {'broken': {'error': 'ValueError: bad'}, 'skipped': {'skipped': 'missing dependency'},
+                              'never_ran': {'error': 'boom'}}}
+    regressions = {(name, metric): new for name, metric, _, new, _ in compare(baseline, current)}
+    assert regressions == {
+        ('gone', 'missing'): 'not in current results',
+        ('broken', 'error'): 'ValueError: bad',
+        ('skipped', 'skipped'): 'missing dependency',
+    }
+
+
+def test_main_compare_exits_non_zero_on_missing_benchmark(tmp_path, capsys):
+    baseline = tmp_path / 'baseline.json'
+    current = tmp_path / 'current.json'
+    baseline.write_text(json.dumps({'benchmarks': {'a': measured()}}))
+    current.write_text(json.dumps({'benchmarks': {}}))
+    assert main(['compare', str(baseline), str(current)]) == 1
+    assert 'REGRESSION a missing' in capsys.readouterr().out
+
+    current.write_text(json.dumps({'benchmarks': {'a': measured()}}))
+    assert main(['compare', str(baseline), str(current)]) == 0
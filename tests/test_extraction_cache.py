@@ -0,0 +1,62 @@
+import io
+import os
+import time
+
+from extraction_cache import DiskLRUCache, ExtractionCache, sha256_file
+
+
+def age(cache, key, seconds):
+    path = cache._path(key)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_sha256_file_accepts_paths_and_streams(tmp_path):
+    path = tmp_path / 'deck.pptx'
+    path.write_bytes(b'deck bytes')
+    stream = io.BytesIO(b'deck bytes')
+    stream.seek(3)
+    assert sha256_file(str(path)) == sha256_file(stream)
+    assert stream.tell() == 3
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=30)
+    for key, seconds in (('a', 30), ('b', 20), ('c', 10)):
+        cache.put_bytes(key, b'x' * 10)
+        age(cache, key, seconds)
+    assert cache.get_bytes('a') == b'x' * 10  # 'b' is now the oldest
+    cache.put_bytes('d', b'x' * 10)
+    assert 'b' not in cache
+    assert all(key in cache for key in ('a', 'c', 'd'))
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 30
+
+
+def test_rejects_entries_over_budget(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=5)
+    assert cache.put_bytes('big', b'x' * 6) is False
+    assert 'big' not in cache
+
+
+def test_hit_and_miss_counts(tmp_path):
+    cache = DiskLRUCache(str(tmp_path))
+    cache.put_bytes('a', b'1')
+    assert cache.get_bytes('a') == b'1'
+    assert cache.get_bytes('b') is None
+    assert cache.touch('a') and not cache.touch('b')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+
+def test_total_survives_restart(tmp_path):
+    DiskLRUCache(str(tmp_path)).put_bytes('a', b'12345')
+    assert DiskLRUCache(str(tmp_path)).stats()['bytes'] == 5
+
+
+def test_extraction_cache_round_trips_records(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    record = {'slides': [{'index': 1, 'title': 'Café'}], 'media': [], 'images': {}}
+    cache.put('abc', record)
+    assert cache.get('abc') == record
+    assert cache.get('missing') is None
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from backend.utils.job_store import JobStore
+from backend.utils.jobs import CANCELLED, COMPLETED, FAILED, RUNNING, Job, JobManager, StoredJob
+
+
+def wait(job):
+    job.future.result(timeout=10)
+
+
+def test_job_runs_and_publishes_results():
+    manager = JobManager(max_workers=1)
+    job = manager.submit(lambda job: [job.add_result({'n': n}) for n in range(3)])
+    wait(job)
+    assert job.status == COMPLETED
+    assert job.results == [{'n': 0}, {'n': 1}, {'n': 2}]
+    events = [event for _, event in job.iter_events()]
+    assert [event['type'] for event in events] == ['status', 'result', 'result', 'result', 'status']
+    manager.shutdown()
+
+
+def test_job_failure_is_recorded():
+    def fail(job):
+        raise RuntimeError('boom')
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit(fail)
+    wait(job)
+    assert job.status == FAILED
+    assert job.error == 'boom'
+    manager.shutdown()
+
+
+def test_cancel_stops_a_running_job():
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while not job.is_cancelled():
+            job.publish('tick')
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit(work)
+    started.wait(5)
+    manager.cancel(job.job_id)
+    wait(job)
+    assert job.status == CANCELLED
+    manager.shutdown()
+
+
+def test_prune_keeps_the_most_recent_jobs():
+    manager = JobManager(max_workers=1, max_jobs=2)
+    jobs = [manager.submit(lambda job: None) for _ in range(4)]
+    for job in jobs:
+        wait(job)
+    manager.submit(lambda job: None)
+    assert manager.get(jobs[0].job_id) is None
+    assert manager.get(jobs[-1].job_id) is jobs[-1]
+    manager.shutdown()
+
+
+def test_other_process_sees_stored_job(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite')
+    runner = JobManager(max_workers=1, store=JobStore(db_path))
+    job = runner.submit(lambda job: job.add_result({'persona': 'a'}))
+    wait(job)
+
+    # A second manager stands in for another gunicorn worker
+    other = JobManager(max_workers=1, store=JobStore(db_path))
+    stored = other.get(job.job_id)
+    assert isinstance(stored, StoredJob)
+    state = stored.to_dict()
+    assert state['status'] == COMPLETED
+    assert state['results'] == [{'persona': 'a'}]
+    events = list(stored.iter_events(start=1))
+    assert [index for index, _ in events] == [1, 2]
+    assert events[0][1] == {'type': 'result', 'data': {'persona': 'a'}}
+    assert other.get('missing') is None
+    runner.shutdown()
+    other.shutdown()
+
+
+def test_cancel_through_another_process(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite')
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while not job.is_cancelled():
+            started.wait(0.01)
+
+    runner = JobManager(max_workers=1, store=JobStore(db_path))
+    job = runner.submit(work)
+    started.wait(5)
+    JobManager(max_workers=1, store=JobStore(db_path)).cancel(job.job_id)
+    wait(job)
+    assert job.status == CANCELLED
+    runner.shutdown()
+
+
+def test_readers_that_see_a_finished_job_see_its_final_event(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))
+    job = Job(store=store)
+    job.set_status(RUNNING)
+    final_event = {'type': 'status', 'data': {'status': COMPLETED, 'error': None}}
+    stored_events = []
+    save = store.save
+
+    def slow_save(saved):
+        if saved.is_finished():
+            # Other processes see the finished status only once its event is stored
+            stored_events.extend(event for _, event in store.events(saved.job_id))
+            time.sleep(0.2)
+        save(saved)
+
+    store.save = slow_save
+    events = []
+    reader = threading.Thread(target=lambda: events.extend(event for _, event in job.iter_events(timeout=0.01)))
+    reader.start()
+    time.sleep(0.05)
+    job.set_status(COMPLETED)
+    reader.join(5)
+    assert events[-1] == final_event
+    assert stored_events[-1] == final_event
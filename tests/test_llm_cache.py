@@ -0,0 +1,48 @@
+from backend.utils.llm_cache import LLMCache, cache_key
+
+
+def response(text):
+    return {'choices': [{'message': {'content': text}}], 'usage': {'prompt_tokens': 3, 'completion_tokens': 2}}
+
+
+def test_cache_key_ignores_whitespace_and_transport_params():
+    a = cache_key('gpt', {'messages': [{'role': 'user', 'content': ' hi '}], 'temperature': 0, 'timeout': 5})
+    b = cache_key('gpt', {'messages': [{'role': 'user', 'content': 'hi'}], 'temperature': 0, 'stream': False})
+    c = cache_key('gpt', {'messages': [{'role': 'user', 'content': 'hi'}], 'temperature': 1})
+    assert a == b
+    assert a != c
+
+
+def test_get_returns_stored_response_and_counts_savings(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    assert cache.get('k') is None
+    cache.put('k', response('hello'))
+    assert cache.get('k') == response('hello')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['tokens_saved']) == (1, 1, 5)
+
+
+def test_evicts_least_recently_used_when_over_budget(tmp_path):
+    entry = response('x' * 100)
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'), max_bytes=3 * 200)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, entry)
+    cache.get('a')  # 'b' is now the least recently used
+    cache.put('d', entry)
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in ('a', 'c', 'd'))
+    assert cache.stats()['evictions'] == 1
+    assert cache.total_bytes == cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_replacing_an_entry_does_not_double_count(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    cache.put('k', response('one'))
+    cache.put('k', response('one'))
+    assert cache.total_bytes == cache.stats()['bytes']
+
+
+def test_running_total_survives_reopen(tmp_path):
+    path = str(tmp_path / 'llm.sqlite')
+    LLMCache(path).put('k', response('hello'))
+    assert LLMCache(path).total_bytes == LLMCache(path).stats()['bytes'] > 0
@@ -0,0 +1,118 @@
+import pytest
+
+pytest.importorskip('tinytroupe')
+
+import backend.utils.persona as persona_module
+import backend.utils.population_store as population_store
+from backend.utils.persona import Persona, shared_stimulus_placeholder
+
+
+class CountingFactory:
+    def __init__(self):
+        self.generated = 0
+
+    def generate_person(self):
+        self.generated += 1
+        return f"person {self.generated}"
+
+
+def make_persona(population_size=5):
+    persona = Persona('Engineer', 'Builds things', population_size=population_size)
+    persona.factory = CountingFactory()
+    return persona
+
+
+def test_create_population_reports_each_member():
+    persona = make_persona(3)
+    progress = []
+    population = persona.create_population(on_progress=lambda p, done, total: progress.append((done, total)))
+    assert population == ['person 1', 'person 2', 'person 3']
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_create_population_stops_between_members():
+    persona = make_persona(5)
+    persona.population = ['previous']
+    assert persona.create_population(force=True, should_stop=lambda: persona.factory.generated >= 2) is None
+    assert persona.factory.generated == 2
+    # An interrupted run leaves the previous population in place
+    assert persona.population == ['previous']
+
+
+class TranscriptAgent:
+    def __init__(self, name, transcript):
+        self.name = name
+        self.transcript = transcript
+
+    def pretty_current_interactions(self, max_content_length=None):
+        return self.transcript
+
+
+class FallbackExtractor:
+    def __init__(self, field):
+        self.field = field
+
+    def extract_results_from_agent(self, agent):
+        return {self.field: f"fallback {agent.name}"}
+
+
+class StoredAgent:
+    def __init__(self, name):
+        self.name = name
+
+    def to_json(self, include=None, suppress=None, serialization_type_field_name='type'):
+        return {'type': 'TinyPerson', 'persona': {'name': self.name}}
+
+
+def test_saving_a_partly_loaded_population_keeps_its_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(population_store, 'load_agent', lambda spec, *args: StoredAgent(spec['persona']['name']))
+    folder = str(tmp_path / 'population')
+    persona = make_persona()
+    persona.population = [StoredAgent('a'), StoredAgent('b'), StoredAgent('c')]
+    persona.save_population(folder)
+
+    persona.load_population(folder, names=['b'])
+    persona.get_member('c')
+    persona.save_population()
+    assert [agent.name for agent in persona.load_population(folder)] == ['a', 'b', 'c']
+
+
+def test_extraction_batches_strip_shared_stimuli():
+    deck = 'Slide 1\n' + 'word ' * 2000
+    agents = [TranscriptAgent(name, f"USER: {deck}\n{name}: looks fine") for name in ('a', 'b', 'c')]
+    batches = make_persona().extraction_batches(agents, token_budget=100, shared_stimuli=[deck])
+    assert len(batches) == 1
+    assert all(transcript == f"USER: {shared_stimulus_placeholder}\n{agent.name}: looks fine"
+               for agent, transcript in batches[0])
+
+
+def test_failed_batch_falls_back_per_agent(monkeypatch):
+    persona = make_persona()
+    persona.persona_spec['prompts'] = {}
+    monkeypatch.setattr(persona, 'analysis_result_extractor', lambda: FallbackExtractor('analysis'))
+    monkeypatch.setattr(persona, 'qna_result_extractor', lambda: FallbackExtractor('qna'))
+
+    def chat_json(messages):
+        if '## Agent: a' in messages[-1]['content']:
+            raise RuntimeError('upstream error')
+        return {'agents': {'b': {'analysis': 'good', 'qna': 'why?'}}}
+
+    monkeypatch.setattr(persona_module, 'chat_json', chat_json)
+    agents = [TranscriptAgent('a', 'word ' * 40), TranscriptAgent('b', 'word ' * 40)]
+    analysis, qna, slides = persona.extract_results(agents, token_budget=20)
+    assert analysis == [{'analysis': 'fallback a'}, {'analysis': 'good'}]
+    assert qna == [{'qna': 'fallback a'}, {'qna': 'why?'}]
+    assert slides == [None, None]
+
+
+def test_extraction_returns_per_slide_reviews(monkeypatch):
+    persona = make_persona()
+    persona.persona_spec['prompts'] = {}
+
+    def chat_json(messages):
+        assert 'for each of slides 1, 2' in messages[0]['content']
+        return {'agents': {'a': {'analysis': 'good', 'qna': 'why?', 'slides': {'1': {'analysis': 'clear'}}}}}
+
+    monkeypatch.setattr(persona_module, 'chat_json', chat_json)
+    _, _, slides = persona.extract_results([TranscriptAgent('a', 'fine')], slide_numbers=[1, 2])
+    assert slides == [{1: {'analysis': 'clear'}, 2: {}}]
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+pytest.importorskip('tinytroupe')
+
+import backend.utils.population_store as population_store
+from backend.utils.population_store import PopulationStore
+
+
+class FakeAgent:
+    def __init__(self, name, occupation='engineer', memory=None):
+        self.name = name
+        self.occupation = occupation
+        self.memory = memory or []
+
+    def to_json(self, include=None, suppress=None, serialization_type_field_name='type'):
+        if include:
+            return {'episodic_memory': self.memory}
+        return {'type': 'TinyPerson', 'persona': {'name': self.name, 'occupation': self.occupation}}
+
+
+def specs_lines(store):
+    with open(store.specs_path, 'rb') as f:
+        return len(f.readlines())
+
+
+def test_replace_sets_membership(tmp_path):
+    store = PopulationStore(str(tmp_path))
+    store.replace([FakeAgent('a'), FakeAgent('b')])
+    store.replace([FakeAgent('c'), FakeAgent('d')])
+    reopened = PopulationStore(str(tmp_path))
+    assert reopened.names() == ['c', 'd']
+    assert 'a' not in reopened
+    with pytest.raises(ValueError):
+        reopened.load_spec('a')
+
+
+def test_unchanged_members_are_not_appended_again(tmp_path):
+    store = PopulationStore(str(tmp_path))
+    agents = [FakeAgent('a'), FakeAgent('b')]
+    store.replace(agents)
+    store.replace(agents)
+    assert specs_lines(store) == 2
+
+    agents[1].occupation = 'designer'
+    store.replace(agents)
+    assert specs_lines(store) == 3
+    assert PopulationStore(str(tmp_path)).load_spec('b')['persona']['occupation'] == 'designer'
+
+
+def test_append_many_adds_to_membership(tmp_path):
+    store = PopulationStore(str(tmp_path))
+    store.append_many([FakeAgent('a')])
+    store.append_many([FakeAgent('b')], include_memory=True)
+    assert store.names() == ['a', 'b']
+    assert store.load_spec('b', include_memory=True)['episodic_memory'] == []
+
+
+def test_compaction_drops_replaced_records(tmp_path):
+    store = PopulationStore(str(tmp_path))
+    for generation in range(5):
+        store.replace([FakeAgent(f"{generation}-{i}") for i in range(3)])
+    assert specs_lines(store) <= 2 * 3
+    reopened = PopulationStore(str(tmp_path))
+    assert reopened.names() == ['4-0', '4-1', '4-2']
+    assert reopened.load_spec('4-2')['persona']['name'] == '4-2'
+
+
+def test_legacy_index_without_membership(tmp_path):
+    store = PopulationStore(str(tmp_path))
+    store.replace([FakeAgent('a'), FakeAgent('b')])
+    os.remove(store.index_path)
+    assert PopulationStore(str(tmp_path)).names() == ['a', 'b']
+
+
+class Registry:
+    """Stands in for TinyPerson's agent registry."""
+
+    all_agents = {}
+
+    @classmethod
+    def get_agent_by_name(cls, name):
+        return cls.all_agents.get(name)
+
+    @classmethod
+    def load_specification(cls, spec, suppress_memory=False):
+        agent = FakeAgent(spec['persona']['name'], spec['persona']['occupation'])
+        cls.all_agents[agent.name] = agent
+        return agent
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(population_store, 'TinyPerson', Registry)
+    monkeypatch.setattr(Registry, 'all_agents', {})
+    return Registry
+
+
+def test_load_reuses_the_same_agent_already_in_memory(tmp_path, registry):
+    store = PopulationStore(str(tmp_path))
+    store.replace([FakeAgent('a'), FakeAgent('b')])
+    in_memory = registry.all_agents['a'] = FakeAgent('a')
+    loaded = store.load_all()
+    assert loaded[0] is in_memory
+    assert loaded[1].name == 'b'
+
+
+def test_load_does_not_substitute_another_agent_with_the_same_name(tmp_path, registry):
+    store = PopulationStore(str(tmp_path))
+    store.replace([FakeAgent('a', 'engineer')])
+    other = registry.all_agents['a'] = FakeAgent('a', 'lawyer')
+    loaded = store.load('a')
+    assert loaded is not other
+    assert loaded.occupation == 'engineer'
+    assert registry.all_agents['a'] is loaded
+
+
+def test_load_with_memory_does_not_reuse_the_live_agent(tmp_path, registry):
+    store = PopulationStore(str(tmp_path))
+    store.replace([FakeAgent('a')], include_memory=True)
+    live = registry.all_agents['a'] = FakeAgent('a')
+    assert store.load('a', include_memory=True) is not live
@@ -0,0 +1,201 @@
+import re
+import threading
+
+import pytest
+
+pytest.importorskip('tinytroupe')
+
+import backend.utils.pulse as pulse_module
+from backend.utils.ppt import PPT
+from backend.utils.pulse import Pulse
+
+
+class FakeAgent:
+    def __init__(self, name):
+        self.name = name
+
+    def minibio(self):
+        return self.name
+
+    def to_json(self, serialization_type_field_name='type'):
+        return {'type': 'TinyPerson', 'persona': {'name': self.name}}
+
+
+class FakePersona:
+    """Just what map_reduce_persona reads from a Persona."""
+
+    def __init__(self, analysis_prompt='Analyze it.'):
+        self.persona_spec = {'persona_id': 'p1', 'persona_type': 'Engineer', 'persona_description': 'Builds things'}
+        self.population = [FakeAgent('Ada'), FakeAgent('Bo')]
+        self.prompts = {'analysis_prompt': analysis_prompt}
+
+    def get_specification(self):
+        return {**self.persona_spec, 'prompts': self.prompts}
+
+    def get_prompt(self, name):
+        return self.prompts.get(name, '')
+
+    def analysis_prompt(self):
+        return self.prompts['analysis_prompt']
+
+    def qna_prompt(self):
+        return 'Ask questions.'
+
+
+def deck(bodies, title='Deck'):
+    return PPT({'title': title}, [{'index': i + 1, 'title': body[:10], 'body': body}
+                                  for i, body in enumerate(bodies)])
+
+
+def make_pulse(bodies, token_budget=700):
+    return Pulse(name='test', ppt=deck(bodies), analysis_mode='map_reduce', token_budget=token_budget)
+
+
+class LLMCalls(list):
+    threads = None
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = LLMCalls()
+    threads = set()
+
+    def chat_json(messages):
+        calls.append(messages)
+        threads.add(threading.current_thread().name.rsplit('_', 1)[0])
+        slides = re.search(r"Review each of slides ([\d, ]+) on its own", messages[0]['content'])
+        if slides:
+            return {'slides': {n: {'analysis': f"review {len(calls)}", 'qna': 'q'} for n in slides[1].split(', ')}}
+        return {'analysis': f"review {len(calls)}", 'qna': 'q'}
+
+    monkeypatch.setattr(pulse_module, 'chat_json', chat_json)
+    calls.threads = threads
+    return calls
+
+
+BODIES = [f"{'word ' * 200}{i}" for i in range(10)]
+
+
+def test_revise_diff_matches_slides_by_content():
+    pulse = make_pulse(['a', 'b', 'c', 'd'])
+    base_id = pulse.pulse_id
+    diff = pulse.revise(deck(['a', 'B', 'c', 'd', 'e']))
+    assert diff == {'unchanged': [1, 3, 4], 'changed': [2], 'added': [5], 'removed': []}
+    assert pulse.base_pulse_id == base_id and pulse.pulse_id != base_id
+
+    # A single edited slide is changed, not also removed
+    diff = pulse.revise(deck(['a', 'B', 'c2', 'd', 'e']))
+    assert diff == {'unchanged': [1, 2, 4, 5], 'changed': [3], 'added': [], 'removed': []}
+
+    # Moved slides are unchanged
+    diff = pulse.revise(deck(['e', 'a', 'x']))
+    assert diff == {'unchanged': [1, 2], 'changed': [3], 'added': [], 'removed': [3, 4]}
+
+
+def test_unchanged_deck_reuses_every_review(llm_calls):
+    pulse = make_pulse(BODIES)
+    persona = FakePersona()
+    first = pulse.map_reduce_persona(persona)
+    assert first['revision']['reused_reviews'] == 0
+    calls = len(llm_calls)
+
+    second = pulse.map_reduce_persona(persona)
+    assert len(llm_calls) == calls
+    assert second['revision']['new_reviews'] == 0
+    assert second['analysis']['extracted_result'] == first['analysis']['extracted_result']
+
+
+def test_revision_only_reviews_changed_slides(llm_calls):
+    pulse = make_pulse(BODIES)
+    persona = FakePersona()
+    pulse.map_reduce_persona(persona)
+    assert len(pulse.ppt.slide_chunks(pulse.token_budget)) > 2
+
+    revised = list(BODIES)
+    revised[-1] = 'a new ending'
+    pulse.revise(deck(revised))
+    result = pulse.map_reduce_persona(persona)
+    assert result['revision']['reviewed_slides'] == [10]
+    assert result['revision']['reused_slides'] == list(range(1, 10))
+    assert result['revision']['reused_reviews'] == 9 * len(persona.population)
+    assert result['revision']['new_merges'] == len(persona.population)
+
+
+def test_single_chunk_deck_only_reviews_the_edited_slide(llm_calls):
+    bodies = [f"slide {i}" for i in range(7)]
+    pulse = make_pulse(bodies)
+    persona = FakePersona()
+    assert len(pulse.ppt.slide_chunks(pulse.token_budget)) == 1
+    pulse.map_reduce_persona(persona)
+
+    revised = list(bodies)
+    revised[3] = 'an edited slide'
+    pulse.revise(deck(revised))
+    calls = len(llm_calls)
+    result = pulse.map_reduce_persona(persona)
+    assert result['revision']['reviewed_slides'] == [4]
+    assert result['revision']['reused_reviews'] == 6 * len(persona.population)
+    # One review of the edited slide and one merge per agent
+    assert len(llm_calls) - calls == 2 * len(persona.population)
+    assert "slide 4 of 7" in llm_calls[calls][1]['content']
+
+
+def test_world_mode_reviews_are_reused_per_slide(llm_calls):
+    pulse = make_pulse([f"slide {i}" for i in range(3)])
+    persona = FakePersona()
+    context = pulse.review_context(persona)
+    # What a world-mode run stores from the per-slide extraction
+    pulse.store_reviews('p1', context, {(agent.name, i): {'analysis': f"{agent.name} on {i}"}
+                                        for agent in persona.population for i in (1, 2, 3)})
+
+    pulse.revise(deck(['slide 0', 'slide 1', 'an edited slide']))
+    result = pulse.map_reduce_persona(persona)
+    assert result['revision']['reviewed_slides'] == [3]
+    assert result['revision']['reused_reviews'] == 2 * len(persona.population)
+    merge = llm_calls[-1][1]['content']
+    assert "on 1" in merge and "on 3" not in merge
+
+
+def test_changed_context_invalidates_stored_reviews(llm_calls):
+    pulse = make_pulse(BODIES)
+    pulse.map_reduce_persona(FakePersona())
+
+    # Same slides, but a different review prompt
+    result = pulse.map_reduce_persona(FakePersona('Judge the pricing only.'))
+    assert result['revision']['reused_reviews'] == 0
+
+    # Same slides and prompts, but different deck details
+    pulse.ppt = deck(BODIES, title='Another deck')
+    result = pulse.map_reduce_persona(FakePersona('Judge the pricing only.'))
+    assert result['revision']['reused_reviews'] == 0
+
+
+def test_plan_reviews_skips_reviews_from_another_context():
+    pulse = make_pulse(BODIES)
+    pulse.store_reviews('p1', 'old', {('Ada', i): {'analysis': 'a'} for i in (1, 2, 3)})
+    reused, chunks = pulse.plan_reviews('p1', ['Ada'], 'new')
+    assert reused == {} and sum(chunks['Ada'], []) == list(range(1, 11))
+    reused, chunks = pulse.plan_reviews('p1', ['Ada'], 'old')
+    assert sorted(reused) == [('Ada', 1), ('Ada', 2), ('Ada', 3)]
+    assert sum(chunks['Ada'], []) == list(range(4, 11))
+
+
+def test_run_decks_shares_one_worker_pool(llm_calls):
+    pulse = make_pulse(BODIES)
+    persona = FakePersona()
+    pulse.personas = {'p1': persona}
+    comparison = pulse.run_decks([deck(BODIES), deck(BODIES[:5], title='Short deck')])
+    assert llm_calls.threads == {'pulse-worker'}
+    (entry,) = comparison['personas']
+    assert [d is not None for d in entry['decks']] == [True, True]
+
+
+def test_multi_deck_personas_are_not_described_by_one_deck():
+    data = {'ppt_title': 'Quarterly numbers', 'personas': [{'name': 'CFO', 'description': 'Watches costs'}]}
+    slides = [{'index': 1, 'title': 'Revenue'}]
+    single = Pulse.from_run_request(data, slides)
+    shared = Pulse.from_run_request(data, slides, describe_deck=False)
+    (single_persona,), (shared_persona,) = single.personas.values(), shared.personas.values()
+    assert 'Quarterly numbers' in single_persona.get_prompt('persona_prompt')
+    assert 'Quarterly numbers' not in shared_persona.get_prompt('persona_prompt')
+    assert 'Watches costs' in shared_persona.get_prompt('persona_prompt')
@@ -0,0 +1,40 @@
+import time
+
+from backend.utils.ratelimit import RateLimiter, TokenBucket
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one unit per second
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == 1.0
+    assert bucket.wait_time(1, now + 1) == 0
+
+
+def test_requests_over_capacity_are_capped():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(1000, bucket.updated) == 0
+
+
+def test_acquire_blocks_once_budget_is_spent():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+    for _ in range(600):
+        limiter.acquire()
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.05
+    assert limiter.stats()['waited'] > 0
+
+
+def test_backoff_doubles_on_rate_limits_and_shrinks_on_success():
+    limiter = RateLimiter(initial_backoff=1.0, max_backoff=3.0)
+    assert limiter.on_rate_limited() == 1.0
+    assert limiter.on_rate_limited() == 2.0
+    assert limiter.on_rate_limited() == 3.0
+    assert limiter.on_rate_limited(retry_after=10) == 10
+    assert limiter.stats()['rate_limited'] == 4
+    limiter.on_success()
+    assert limiter.stats()['backoff'] == 1.5
+    limiter.on_success()
+    assert limiter.stats()['backoff'] == 0.0
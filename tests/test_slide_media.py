@@ -0,0 +1,69 @@
+import io
+import struct
+import zipfile
+import zlib
+
+import slide_media
+from pptx_extractor import MEDIA_PREFIX
+from slide_media import MediaCache, image_size, process_media
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+def jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof + b'\xff\xd9'
+
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00\x00\x00;'
+
+
+class FakeSlide:
+    def __init__(self, index, media):
+        self.index = index
+        self.media = media
+
+
+def deck(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(f"{MEDIA_PREFIX}{name}", data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_image_size_reads_headers():
+    assert image_size(png(640, 480)) == (640, 480)
+    assert image_size(jpeg(4000, 3000)) == (4000, 3000)
+    assert image_size(gif(32, 16)) == (32, 16)
+    assert image_size(b'not an image') is None
+
+
+def test_without_pillow_only_bounded_originals_pass_through(tmp_path, monkeypatch):
+    monkeypatch.setattr(slide_media, 'Image', None)
+    cache = MediaCache(str(tmp_path), max_side=1024)
+    assert cache.make_variant(png(800, 600), 'small.png') == png(800, 600)
+    # A few hundred bytes, but far too large to send as is
+    assert cache.make_variant(png(20000, 20000), 'huge.png') is None
+    assert cache.make_variant(b'BM...', 'image.bmp') is None
+
+
+def test_process_media_dedupes_and_reports_variants(tmp_path, monkeypatch):
+    monkeypatch.setattr(slide_media, 'Image', None)
+    cache = MediaCache(str(tmp_path))
+    image = png(100, 100)
+    manifest = process_media(deck({'a.png': image, 'b.png': image}),
+                             [FakeSlide(1, ['a.png']), FakeSlide(2, ['b.png'])], cache)
+    assert manifest['media']['a.png'] == manifest['media']['b.png']
+    (digest, entry), = manifest['images'].items()
+    assert entry['slides'] == [1, 2]
+    assert entry['variant'] is True
+    assert cache.get(digest) == image
@@ -0,0 +1,43 @@
+from backend.utils.ppt import PPT, clean_notes, slide_hash
+from pptx_extractor import Slide, slides_from_json, slides_to_json
+
+
+def test_slides_from_json_reads_structured_records():
+    slides = slides_from_json([{'index': 2, 'title': 'Plan', 'body': 'Steps', 'notes': 'Say this', 'media': ['a.png']}])
+    assert [(s.index, s.title, s.body, s.notes, s.media) for s in slides] == [(2, 'Plan', 'Steps', 'Say this', ['a.png'])]
+
+
+def test_slides_from_json_reads_legacy_mapping_in_slide_order():
+    legacy = {'slide10': {'text': 'Ten'}, 'slide2': {'text': 'Two', 'notes': 'Note'}, 'slide1': {'text': 'One'}}
+    slides = slides_from_json(legacy)
+    assert [(s.index, s.body, s.notes) for s in slides] == [(1, 'One', ''), (2, 'Two', 'Note'), (10, 'Ten', '')]
+    assert all(s.title == '' for s in slides)
+
+
+def test_slides_from_json_passes_slides_through():
+    slide = Slide(1, 'Title')
+    assert slides_from_json([slide])[0] is slide
+    assert slides_from_json(None) == []
+
+
+def test_slides_to_json_skips_empty_slides():
+    assert slides_to_json([Slide(1, 'Title'), Slide(2)]) == [Slide(1, 'Title').to_dict()]
+
+
+def test_clean_notes_drops_boilerplate_and_slide_number():
+    notes = "Point one\nAI-generated content may be incorrect.\nImage source: stock\n\n\n\nPoint two\n12\n"
+    assert clean_notes(notes) == "Point one\n\nPoint two"
+
+
+def test_slide_hash_ignores_position_and_boilerplate():
+    assert slide_hash(Slide(1, 'T', 'B', 'N')) == slide_hash(Slide(7, 'T', 'B', 'N\n7'))
+    assert slide_hash(Slide(1, 'T', 'B')) != slide_hash(Slide(1, 'T', 'B2'))
+
+
+def test_slide_chunks_respect_token_budget():
+    ppt = PPT({}, [{'index': i, 'body': 'word ' * 100} for i in range(1, 7)])
+    chunks = ppt.slide_chunks(token_budget=300)
+    assert [i for chunk in chunks for i in chunk] == [1, 2, 3, 4, 5, 6]
+    assert len(chunks) > 1
+    # A slide over budget still gets a chunk of its own
+    assert ppt.slide_chunks(token_budget=1) == [[i] for i in range(1, 7)]
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip('tinytroupe')
+
+from uuid import uuid4
+
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+
+from backend.utils.snapshot import PopulationSnapshot
+
+
+def memory_text(agent):
+    return str(agent.episodic_memory.retrieve_all())
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    # Agents only take in stimuli here; acting would call the LLM
+    monkeypatch.setattr(TinyPerson, 'act', lambda self, *args, **kwargs: [])
+
+
+def test_forks_run_independently_from_the_primed_state(no_llm):
+    name = f"Snapshot Tester {uuid4().hex[:8]}"
+    original = TinyPerson(name)
+    with PopulationSnapshot([original]).fork('deck') as fork:
+        primed = PopulationSnapshot.prime(fork, ['Here is the deck.'])
+    assert primed.names == [name]
+    assert 'Here is the deck.' not in memory_text(original)
+
+    with primed.fork('a') as a, primed.fork('b') as b:
+        (ran,) = a.run('A question for fork a only.')
+        (other,) = b.run('A question for fork b only.')
+        assert ran is not original and other is not ran
+        assert 'Here is the deck.' in memory_text(ran) and 'Here is the deck.' in memory_text(other)
+        assert 'fork a only' in memory_text(ran) and 'fork a only' not in memory_text(other)
+        names = [ran.name, other.name]
+        worlds = [a.name, b.name]
+
+    # Finished rounds leave nothing behind in the registries, but their agents stay usable
+    assert not any(n in TinyPerson.all_agents for n in names)
+    assert not any(w in TinyWorld.all_environments for w in worlds)
+    assert 'fork a only' in memory_text(ran)
+    assert TinyPerson.get_agent_by_name(name) is original
+
+
+def test_forked_agents_restore_memory_objects(no_llm):
+    original = TinyPerson(f"Snapshot Tester {uuid4().hex[:8]}")
+    original.listen('Remember this.')
+    with PopulationSnapshot([original]).fork('a') as fork:
+        (copy,) = fork.agents()
+        assert type(copy.episodic_memory) is type(original.episodic_memory)
+        assert type(copy.semantic_memory) is type(original.semantic_memory)
+        assert copy.episodic_memory.retrieve_all() == original.episodic_memory.retrieve_all()